@@ -0,0 +1,189 @@
+"""
+Contains Info about running the Chess Engine in the background
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+from Board import Board
+from Engine import Engine2
+from ParallelSearch import ParallelSearch
+from TranspositionTable import TranspositionTable
+
+# Deepest search made while pondering. Pondering normally stops long before reaching it, when the opponent moves.
+PONDER_MAX_DEPTH = 64
+
+
+@dataclass
+class BackgroundSearch:
+    """
+    Runs the engine's searches on a background thread, so the caller can keep handling events while the engine thinks.
+
+    The engine searches a copy of the board, so the board itself can still be drawn during the search. Only one search
+    runs at a time; start() returns a Future of its result, and poll() returns the result once it is ready.
+
+    While the opponent thinks, ponder() keeps the engine searching the position after their expected reply, or all
+    of their replies, to fill the transposition table. The next search stops the pondering first, and then finds most
+    of the positions it needs already in the table.
+
+    Instance Attributes:
+        - table: The transposition table kept by the engine between its searches
+        - use_bitboards: Whether the engine searches on a BitBoard
+        - parallel_search: The pool of processes to search with, or None to search on the background thread itself
+        - executor: The background thread, or None until the first search
+        - future: The result of the search in progress, or of the last search if it has not been polled yet
+        - engine: The engine running the search in progress, or None if there is none or the pool is used
+        - principal_variation: The principal variation found by the last search that was polled
+        - ponder_future: The pondering search in progress, or None if the engine isn't pondering
+        - ponder_engine: The engine that is pondering, or None if it isn't
+        - expected_reply: The reply of the opponent that is being pondered, or None if all replies are
+    """
+    table: TranspositionTable
+    use_bitboards: bool
+    parallel_search: Optional[ParallelSearch]
+    executor: Optional[ThreadPoolExecutor]
+    future: Optional[Future]
+    engine: Optional[Engine2]
+    principal_variation: list[tuple[tuple[int, int], tuple[int, int]]]
+    ponder_future: Optional[Future]
+    ponder_engine: Optional[Engine2]
+    expected_reply: Optional[tuple[tuple[int, int], tuple[int, int]]]
+
+    def __init__(self, table: TranspositionTable, use_bitboards: bool = False,
+                 parallel_search: Optional[ParallelSearch] = None):
+        self.table = table
+        self.use_bitboards = use_bitboards
+        self.parallel_search = parallel_search
+        self.executor = None
+        self.future = None
+        self.engine = None
+        self.principal_variation = []
+        self.ponder_future = None
+        self.ponder_engine = None
+        self.expected_reply = None
+
+    def start(self, board: Board, colour: str, max_depth: int, time_limit: Optional[float] = None,
+              callback: Optional[Callable] = None) -> Future:
+        """
+        Start searching for a move for colour on board, up to max_depth moves deep within the time limit (in seconds).
+        Return a Future of the move and its score, like Engine2.iterative_deepening.
+
+        If callback is given, it is called with the move and score when the search finishes, on the background thread.
+        It isn't called if the search is cancelled.
+        """
+        self.stop_pondering()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        board = Board.from_snapshot(board.snapshot())
+
+        if self.parallel_search is not None:
+            self.engine = None
+            self.future = self.executor.submit(self.parallel_search.select_move, board, colour, max_depth, time_limit)
+        else:
+            self.engine = Engine2(board, self.table, self.use_bitboards)
+            self.future = self.executor.submit(self.engine.iterative_deepening, colour, max_depth, time_limit)
+
+        if callback is not None:
+            engine = self.engine
+
+            def finished(future: Future):
+                # A search cancelled after it started still finishes with the best move found so far, which is
+                # thrown away, and cancelling a parallel search makes it fail
+                if future.cancelled() or (engine is not None and engine.stopped) or future.exception() is not None:
+                    return
+                if future.result() is not None:
+                    callback(future.result())
+            self.future.add_done_callback(finished)
+        return self.future
+
+    def is_searching(self) -> bool:
+        """
+        Return whether a search has been started whose result has not been polled yet
+        """
+        return self.future is not None
+
+    def poll(self):
+        """
+        Return the move and score found by the last search if it has finished, or None if it is still running.
+        The result is only returned once.
+        """
+        if self.future is None or not self.future.done():
+            return None
+        result = self.future.result()
+        self.principal_variation = self.engine.principal_variation if self.engine is not None else []
+        self.future = None
+        self.engine = None
+        return result
+
+    def ponder(self, board: Board, colour: str):
+        """
+        Start pondering on board for colour, after colour has made the first move of the last principal variation
+        and while its opponent is to move. Pondering carries on until the next search starts or it is cancelled.
+
+        Only searches on the background thread share the transposition table, so a pool of processes doesn't ponder.
+        """
+        if self.parallel_search is not None:
+            return
+        self.stop_pondering()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        board = Board.from_snapshot(board.snapshot())
+        opponent = 'B' if colour == 'W' else 'W'
+
+        self.expected_reply = None
+        if len(self.principal_variation) >= 2 and self.principal_variation[1] in board.legal_check_moves(opponent):
+            self.expected_reply = self.principal_variation[1]
+        self.ponder_engine = Engine2(board, self.table, self.use_bitboards)
+        if self.expected_reply is not None:
+            # Search for colour's answer to the expected reply
+            self.ponder_engine.make_move(self.expected_reply)
+            self.ponder_future = self.executor.submit(self.ponder_engine.iterative_deepening, colour,
+                                                      PONDER_MAX_DEPTH)
+        else:
+            # Search every reply, which stores colour's answers to each of them
+            self.ponder_future = self.executor.submit(self.ponder_engine.iterative_deepening, opponent,
+                                                      PONDER_MAX_DEPTH)
+
+    def is_pondering(self) -> bool:
+        """
+        Return whether the engine is pondering
+        """
+        return self.ponder_future is not None
+
+    def stop_pondering(self):
+        """
+        Stop pondering, and wait for the pondering search to finish so the transposition table is free
+        """
+        if self.ponder_future is not None:
+            self.ponder_engine.stop()
+            self.ponder_future.result()
+        self.ponder_future = None
+        self.ponder_engine = None
+
+    def cancel(self):
+        """
+        Stop the search in progress and any pondering, and throw away the result of the search
+        """
+        self.stop_pondering()
+        if self.future is not None:
+            self.future.cancel()
+            if self.engine is not None:
+                self.engine.stop()
+            elif self.parallel_search is not None:
+                # The worker processes can't be interrupted, so leave them to finish in the background
+                self.parallel_search.shutdown(wait=False)
+        self.future = None
+        self.engine = None
+
+    def shutdown(self):
+        """
+        Cancel any search in progress and stop the background thread
+        """
+        self.cancel()
+        if self.executor is not None:
+            # Don't wait for the worker processes of a cancelled parallel search
+            self.executor.shutdown(wait=self.parallel_search is None)
+            self.executor = None
+        if self.parallel_search is not None:
+            self.parallel_search.shutdown()
@@ -0,0 +1,504 @@
+"""
+Contains Info about the Bitboard representation of a Chess Board
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+from Board import Board, King, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE, CASTLING_KEPT, \
+    ZOBRIST_PIECES, ZOBRIST_CASTLING, ZOBRIST_BLACK_TO_MOVE, ZOBRIST_EN_PASSANT, EVALUATION_VALUES, CASTLED_BONUS, \
+    CENTRAL_KNIGHT_BONUS, CENTRAL_PAWN_BONUS
+from Moves import SQUARE_POSITIONS, CAPTURE_FLAG, PROMOTION_FLAG, PROMOTION_SHIFT, END_SHIFT, TACTICAL_MOVES, \
+    QUIET_MOVES, ALL_MOVES, decode_move
+
+# Squares are numbered rank * 8 + file, so bit 0 is A1 and bit 63 is H8
+FULL = (1 << 64) - 1
+NOTATIONS = [colour + notation for colour in 'WB' for notation in 'KQRBNP']
+
+# Centre files, where knights and pawns that have moved get a positional bonus
+CENTRE_FILES = sum(1 << (rank * 8 + file) for rank in range(8) for file in range(2, 6))
+PAWN_START_RANKS = {'W': 0xFF << 8, 'B': 0xFF << 48}
+# The first and last ranks, where a pawn's move is a promotion
+PROMOTION_RANKS = 0xFF | 0xFF << 56
+
+
+def _step_attacks(offsets: tuple[tuple[int, int], ...]) -> list[int]:
+    """
+    Return, for each square, the mask of squares reached by taking one of the (rank, file) offsets from it
+    """
+    table = []
+    for rank, file in SQUARE_POSITIONS:
+        mask = 0
+        for rank_step, file_step in offsets:
+            if 0 <= rank + rank_step <= 7 and 0 <= file + file_step <= 7:
+                mask |= 1 << ((rank + rank_step) * 8 + file + file_step)
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _step_attacks(((1, -2), (2, -1), (2, 1), (1, 2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+KING_ATTACKS = _step_attacks(((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)))
+# The squares attacked by a pawn of each colour
+PAWN_ATTACKS = {'W': _step_attacks(((1, -1), (1, 1))), 'B': _step_attacks(((-1, -1), (-1, 1)))}
+
+# Sliding directions. Those that increase the square number come first, so the nearest piece on one of their rays is
+# the lowest set bit, while for the others it is the highest set bit
+ROOK_DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+POSITIVE_DIRECTIONS = {(1, 0), (0, 1), (1, 1), (1, -1)}
+
+
+def _ray(square: int, direction: tuple[int, int]) -> int:
+    """
+    Return the mask of squares from square, not including it, to the edge of the board in direction
+    """
+    rank, file = SQUARE_POSITIONS[square]
+    mask = 0
+    rank, file = rank + direction[0], file + direction[1]
+    while 0 <= rank <= 7 and 0 <= file <= 7:
+        mask |= 1 << (rank * 8 + file)
+        rank, file = rank + direction[0], file + direction[1]
+    return mask
+
+
+# For each direction: (its rays from every square, whether it increases the square number)
+RAYS = {direction: ([_ray(square, direction) for square in range(64)], direction in POSITIVE_DIRECTIONS)
+        for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+
+def _between(start: int, end: int) -> int:
+    """
+    Return the mask of squares strictly between start and end if they are on the same line, otherwise 0
+    """
+    for rays, positive in RAYS.values():
+        if rays[start] >> end & 1:
+            return rays[start] & ~rays[end] & ~(1 << end)
+    return 0
+
+
+BETWEEN = [[_between(start, end) for end in range(64)] for start in range(64)]
+
+
+def sliding_attacks(square: int, occupied: int, directions: tuple[tuple[int, int], ...]) -> int:
+    """
+    Return the squares attacked from square along directions, stopping at the first occupied square on each ray
+    """
+    attacks = 0
+    for direction in directions:
+        rays, positive = RAYS[direction]
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= rays[blocker]
+        attacks |= ray
+    return attacks
+
+
+def squares_of(mask: int) -> list[int]:
+    """
+    Return the squares set in mask
+
+    >>> squares_of(0b1001)
+    [0, 3]
+    """
+    squares = []
+    while mask:
+        lowest = mask & -mask
+        squares.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return squares
+
+
+@dataclass
+class BitBoard:
+    """
+    A Chess Board stored as one 64-bit mask for each type of piece of each colour.
+
+    It has the same interface for making, unmaking and generating moves as Board, with moves given as
+    (start_position, end_position) tuples or encoded by encode_move, so the engines can search on either one.
+
+    Instance Attributes:
+        - bitboards: Maps the notation of each type of piece (e.g. 'WP') to the mask of squares it is on
+        - occupied: Maps each colour to the mask of squares its pieces are on
+        - squares: The notation of the piece on each square, or None if it is empty
+        - castling: The castling rights of both players as a bitmask
+        - en_passant: The square that can be captured onto en passant, as in Board, or None
+        - has_castled: Maps each colour to whether its king has castled
+        - zobrist_key: The Zobrist hash of the position, the same as Board's for the same position
+        - material: The value of White's pieces minus the value of Black's pieces, in tenths of a pawn
+        - positional: White's positional bonuses minus Black's positional bonuses, in tenths of a pawn
+        - moves: A list of the moves made, each stored with everything needed to unmake it, or None for a null move
+    """
+    bitboards: dict[str, int]
+    occupied: dict[str, int]
+    squares: list[Optional[str]]
+    castling: int
+    en_passant: Optional[int]
+    has_castled: dict[str, bool]
+    zobrist_key: int
+    material: int
+    positional: int
+    moves: list[Optional[tuple]]
+
+    def __init__(self, board: Board):
+        """
+        Create a BitBoard holding the same position as board
+        """
+        self.bitboards = {notation: 0 for notation in NOTATIONS}
+        self.occupied = {'W': 0, 'B': 0}
+        self.squares = [None] * 64
+        self.has_castled = {'W': False, 'B': False}
+
+        for piece in board.white_pieces + board.black_pieces:
+            square = piece.position[0] * 8 + piece.position[1]
+            self.bitboards[piece.notation] |= 1 << square
+            self.occupied[piece.colour] |= 1 << square
+            self.squares[square] = piece.notation
+            if isinstance(piece, King):
+                self.has_castled[piece.colour] = piece.has_castled
+
+        self.castling = board.castling
+        self.en_passant = None if board.en_passant is None else board.en_passant[0] * 8 + board.en_passant[1]
+        self.zobrist_key = board.zobrist_key
+        self.material = board.material
+        self.positional = board.positional
+        self.moves = []
+
+    def piece_at(self, position: tuple[int, int]) -> Optional[str]:
+        """
+        Return the notation of the piece at position, or None if the square is empty
+        """
+        return self.squares[position[0] * 8 + position[1]]
+
+    def piece_list(self) -> list[tuple[str, tuple[int, int]]]:
+        """
+        Return the notation and position of every piece on the board
+        """
+        return [(self.squares[square], SQUARE_POSITIONS[square])
+                for square in squares_of(self.occupied['W'] | self.occupied['B'])]
+
+    def piece_count(self) -> int:
+        """
+        Return the number of pieces on the board
+        """
+        return bin(self.occupied['W'] | self.occupied['B']).count('1')
+
+    def castling_rights(self) -> int:
+        """
+        Return the castling rights of both players as a bitmask
+        """
+        return self.castling
+
+    def get_king_location(self, colour: str) -> tuple[int, int]:
+        """
+        Return the position of the colour king
+        """
+        return SQUARE_POSITIONS[self.bitboards[colour + 'K'].bit_length() - 1]
+
+    def attackers(self, square: int, colour: str, occupied: int) -> int:
+        """
+        Return the mask of colour's pieces attacking square, when the occupied squares are occupied
+        """
+        bitboards = self.bitboards
+        opponent = 'B' if colour == 'W' else 'W'
+        queens = bitboards[colour + 'Q']
+        return (KNIGHT_ATTACKS[square] & bitboards[colour + 'N']
+                | KING_ATTACKS[square] & bitboards[colour + 'K']
+                | PAWN_ATTACKS[opponent][square] & bitboards[colour + 'P']
+                | sliding_attacks(square, occupied, BISHOP_DIRECTIONS) & (bitboards[colour + 'B'] | queens)
+                | sliding_attacks(square, occupied, ROOK_DIRECTIONS) & (bitboards[colour + 'R'] | queens))
+
+    def square_attacked(self, position: tuple[int, int], colour: str) -> bool:
+        """
+        Return whether position is attacked by any of colour's pieces
+        """
+        occupied = self.occupied['W'] | self.occupied['B']
+        return self.attackers(position[0] * 8 + position[1], colour, occupied) != 0
+
+    def king_in_check(self, colour: str) -> bool:
+        """
+        Return whether the king of colour is in check or not.
+        """
+        king = self.bitboards[colour + 'K'].bit_length() - 1
+        return self.attackers(king, 'B' if colour == 'W' else 'W', self.occupied['W'] | self.occupied['B']) != 0
+
+    def legal_check_moves(self, colour: str) -> set[tuple[tuple[int, int], tuple[int, int]]]:
+        """
+        Return all the moves that can be legally made by a certain colour.
+        """
+        moves = array('H')
+        self.generate_moves(colour, moves)
+        return {decode_move(move) for move in moves}
+
+    def generate_moves(self, colour: str, moves: array, kinds: int = ALL_MOVES):
+        """
+        Fill moves with all the moves that can be legally made by a certain colour, encoded by encode_move. A pawn
+        reaching the last rank gives one move for each piece it can be promoted to. Only captures and promotions are
+        generated if kinds is TACTICAL_MOVES, and only the other moves if it is QUIET_MOVES.
+
+        Pins and checks against the king are found once, then every piece's attacks are masked down to its legal
+        targets.
+        """
+        del moves[:]
+        bitboards = self.bitboards
+        opponent = 'B' if colour == 'W' else 'W'
+        own, enemy = self.occupied[colour], self.occupied[opponent]
+        occupied = own | enemy
+        king = bitboards[colour + 'K'].bit_length() - 1
+
+        # The squares that moves of the kinds asked for can end on, where a pawn's move to the last rank is always a
+        # promotion
+        wanted = (enemy if kinds & TACTICAL_MOVES else 0) | (FULL & ~occupied if kinds & QUIET_MOVES else 0)
+        pawn_wanted = wanted | PROMOTION_RANKS if kinds & TACTICAL_MOVES else wanted & ~PROMOTION_RANKS
+
+        # King moves, looking through the king so it can't step back along the line of a check
+        without_king = occupied ^ (1 << king)
+        for target in squares_of(KING_ATTACKS[king] & ~own & wanted):
+            if not self.attackers(target, opponent, without_king):
+                moves.append(king | target << END_SHIFT | (CAPTURE_FLAG if enemy >> target & 1 else 0))
+
+        checkers = self.attackers(king, opponent, occupied)
+        if checkers & (checkers - 1):
+            # Only the king can move out of double check
+            return
+
+        targets = FULL & ~own
+        if checkers:
+            # Capture the checking piece or block the check
+            checker = checkers.bit_length() - 1
+            targets &= checkers | BETWEEN[king][checker]
+        elif kinds & QUIET_MOVES:
+            self.castling_moves(colour, king, occupied, moves)
+
+        pins = self.pins(colour, king, own, enemy)
+
+        # Knights, Bishops, Rooks and Queens
+        for notation in 'NBRQ':
+            for square in squares_of(bitboards[colour + notation]):
+                if notation == 'N':
+                    attacks = KNIGHT_ATTACKS[square]
+                elif notation == 'B':
+                    attacks = sliding_attacks(square, occupied, BISHOP_DIRECTIONS)
+                elif notation == 'R':
+                    attacks = sliding_attacks(square, occupied, ROOK_DIRECTIONS)
+                else:
+                    attacks = sliding_attacks(square, occupied, BISHOP_DIRECTIONS + ROOK_DIRECTIONS)
+                attacks &= targets & wanted & pins.get(square, FULL)
+                for target in squares_of(attacks):
+                    moves.append(square | target << END_SHIFT | (CAPTURE_FLAG if enemy >> target & 1 else 0))
+
+        # Pawns
+        step = 8 if colour == 'W' else -8
+        start_ranks = PAWN_START_RANKS[colour]
+        en_passant = self.en_passant
+        if not kinds & TACTICAL_MOVES or en_passant is None or en_passant >> 3 != (5 if colour == 'W' else 2):
+            en_passant = None
+        for square in squares_of(bitboards[colour + 'P']):
+            reachable = PAWN_ATTACKS[colour][square] & enemy
+            single = square + step
+            if 0 <= single < 64 and not occupied >> single & 1:
+                reachable |= 1 << single
+                if start_ranks >> square & 1 and not occupied >> (single + step) & 1:
+                    reachable |= 1 << (single + step)
+            reachable &= targets & pawn_wanted & pins.get(square, FULL)
+            if en_passant is not None and PAWN_ATTACKS[colour][square] >> en_passant & 1:
+                # Both pawns leave the rank, which can uncover an attack along it that the pins don't show, so the
+                # king's safety is checked with the capture made
+                captured = en_passant - step
+                after = occupied ^ (1 << square) ^ (1 << captured) | 1 << en_passant
+                if not self.attackers(king, opponent, after) & ~(1 << captured):
+                    moves.append(square | en_passant << END_SHIFT | CAPTURE_FLAG)
+            for target in squares_of(reachable):
+                move = square | target << END_SHIFT | (CAPTURE_FLAG if enemy >> target & 1 else 0)
+                if target >> 3 == 0 or target >> 3 == 7:
+                    for index in range(4):
+                        moves.append(move | PROMOTION_FLAG | index << PROMOTION_SHIFT)
+                else:
+                    moves.append(move)
+
+    def pins(self, colour: str, king: int, own: int, enemy: int) -> dict[int, int]:
+        """
+        Return a dictionary mapping each of colour's pieces that is pinned to its king to the mask of squares it can
+        still move to, which are the squares between the king and the pinning piece, and the pinning piece's square
+        """
+        bitboards = self.bitboards
+        opponent = 'B' if colour == 'W' else 'W'
+        pins = {}
+        for directions, slider in ((ROOK_DIRECTIONS, 'R'), (BISHOP_DIRECTIONS, 'B')):
+            sliders = bitboards[opponent + slider] | bitboards[opponent + 'Q']
+            for direction in directions:
+                rays, positive = RAYS[direction]
+                pieces = rays[king] & (own | enemy)
+                if not pieces:
+                    continue
+                # Find the first two pieces along the ray
+                if positive:
+                    first = (pieces & -pieces).bit_length() - 1
+                    rest = pieces ^ (1 << first)
+                    second = (rest & -rest).bit_length() - 1
+                else:
+                    first = pieces.bit_length() - 1
+                    rest = pieces ^ (1 << first)
+                    second = rest.bit_length() - 1
+                if rest and own >> first & 1 and sliders >> second & 1:
+                    pins[first] = BETWEEN[king][second] | (1 << second)
+        return pins
+
+    def castling_moves(self, colour: str, king: int, occupied: int, moves: array):
+        """
+        Add the legal castling moves for colour to moves, when the king is on king and not in check
+        """
+        opponent = 'B' if colour == 'W' else 'W'
+        if colour == 'W':
+            kingside, queenside = WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            kingside, queenside = BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+        if self.castling & kingside and not BETWEEN[king][king + 3] & occupied and \
+                not self.attackers(king + 1, opponent, occupied) and not self.attackers(king + 2, opponent, occupied):
+            moves.append(king | (king + 2) << END_SHIFT)
+        if self.castling & queenside and not BETWEEN[king][king - 4] & occupied and \
+                not self.attackers(king - 1, opponent, occupied) and not self.attackers(king - 2, opponent, occupied):
+            moves.append(king | (king - 2) << END_SHIFT)
+
+    def make_move(self, start_position: tuple[int, int], end_position: tuple[int, int],
+                  promotion: Optional[str] = None):
+        """
+        Move the piece at start_position to end_position, promoting it to promotion if it is a pawn reaching the last
+        rank
+        """
+        start = start_position[0] * 8 + start_position[1]
+        end = end_position[0] * 8 + end_position[1]
+        notation = self.squares[start]
+        target = self.squares[end]
+        colour = notation[0]
+        captured = end
+        if target is None and notation[1] == 'P' and (end - start) & 7:
+            # An en passant capture takes the pawn beside the end square
+            captured = end - 8 if colour == 'W' else end + 8
+            target = self.squares[captured]
+
+        self.moves.append((start, end, target, promotion, self.castling, self.en_passant, self.has_castled[colour],
+                           self.zobrist_key, self.material, self.positional))
+
+        key = self.zobrist_key ^ ZOBRIST_BLACK_TO_MOVE ^ ZOBRIST_CASTLING[self.castling]
+        if self.en_passant is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant & 7]
+        positional = self.positional - self.positional_score(notation, start)
+        if target is not None:
+            self.remove_piece(target, captured)
+            key ^= ZOBRIST_PIECES[target][captured]
+            self.material -= material_score(target)
+            positional -= self.positional_score(target, captured)
+
+        self.remove_piece(notation, start)
+        key ^= ZOBRIST_PIECES[notation][start]
+        if promotion is not None:
+            self.material += material_score(colour + promotion) - material_score(notation)
+            notation = colour + promotion
+        self.add_piece(notation, end)
+        key ^= ZOBRIST_PIECES[notation][end]
+
+        if notation[1] == 'K' and abs(end - start) == 2:
+            # Move the rook when castling
+            rook_start, rook_end = (start + 3, start + 1) if end > start else (start - 4, start - 1)
+            self.remove_piece(colour + 'R', rook_start)
+            self.add_piece(colour + 'R', rook_end)
+            key ^= ZOBRIST_PIECES[colour + 'R'][rook_start] ^ ZOBRIST_PIECES[colour + 'R'][rook_end]
+            self.has_castled[colour] = True
+
+        self.en_passant = None
+        if notation[1] == 'P' and abs(end - start) == 16 and \
+                PAWN_ATTACKS[colour][(start + end) >> 1] & self.bitboards[('B' if colour == 'W' else 'W') + 'P']:
+            # The pawn can be captured en passant by an enemy pawn beside it
+            self.en_passant = (start + end) >> 1
+            key ^= ZOBRIST_EN_PASSANT[end & 7]
+
+        self.castling &= CASTLING_KEPT[start] & CASTLING_KEPT[end]
+        self.zobrist_key = key ^ ZOBRIST_CASTLING[self.castling]
+        self.positional = positional + self.positional_score(notation, end)
+
+    def make_null_move(self):
+        """
+        Pass the turn to the other player without moving a piece. Undone by unmake_move like any move.
+        """
+        self.moves.append(None)
+        self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+
+    def unmake_move(self):
+        """
+        Undo the last move made
+        """
+        if self.moves[-1] is None:
+            self.moves.pop()
+            self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+            return
+
+        start, end, target, promotion, self.castling, self.en_passant, has_castled, self.zobrist_key, self.material, \
+            self.positional = self.moves.pop()
+        notation = self.squares[end]
+        colour = notation[0]
+        self.has_castled[colour] = has_castled
+
+        self.remove_piece(notation, end)
+        if promotion is not None:
+            notation = colour + 'P'
+        self.add_piece(notation, start)
+        if target is not None:
+            if notation[1] == 'P' and end == self.en_passant:
+                # Put back the pawn captured en passant beside the end square
+                self.add_piece(target, end - 8 if colour == 'W' else end + 8)
+            else:
+                self.add_piece(target, end)
+
+        if notation[1] == 'K' and abs(end - start) == 2:
+            rook_start, rook_end = (start + 3, start + 1) if end > start else (start - 4, start - 1)
+            self.remove_piece(colour + 'R', rook_end)
+            self.add_piece(colour + 'R', rook_start)
+
+    def add_piece(self, notation: str, square: int):
+        """
+        Put the piece with the given notation on square
+        """
+        self.bitboards[notation] |= 1 << square
+        self.occupied[notation[0]] |= 1 << square
+        self.squares[square] = notation
+
+    def remove_piece(self, notation: str, square: int):
+        """
+        Take the piece with the given notation off square
+        """
+        self.bitboards[notation] ^= 1 << square
+        self.occupied[notation[0]] ^= 1 << square
+        self.squares[square] = None
+
+    def positional_score(self, notation: str, square: int) -> int:
+        """
+        Return the positional bonus of the piece with the given notation on square, positive for White and negative
+        for Black. This matches Board's positional_score, with a pawn off its starting rank counted as having moved.
+        """
+        colour, kind = notation
+        bonus = 0
+        if kind == 'K':
+            if self.has_castled[colour]:
+                bonus = CASTLED_BONUS
+        elif kind == 'N':
+            if CENTRE_FILES >> square & 1:
+                bonus = CENTRAL_KNIGHT_BONUS
+        elif kind == 'P':
+            if CENTRE_FILES >> square & 1 and not PAWN_START_RANKS[colour] >> square & 1:
+                bonus = CENTRAL_PAWN_BONUS
+        return bonus if colour == 'W' else -bonus
+
+
+def material_score(notation: str) -> int:
+    """
+    Return the value of the piece with the given notation, positive for White and negative for Black
+    """
+    value = EVALUATION_VALUES[notation[1]]
+    return value if notation[0] == 'W' else -value
@@ -3,19 +3,125 @@ Contains Info about Chess Board
 """
 
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
-from typing import Optional
-from Chess_Pieces.Pieces import Piece
+import random
+from typing import ClassVar, Optional
+from Chess_Pieces.Pieces import Piece, piece_rays
 from Chess_Pieces.King import King
 from Chess_Pieces.Queen import Queen
 from Chess_Pieces.Rook import Rook
 from Chess_Pieces.Bishop import Bishop
 from Chess_Pieces.Knight import Knight
 from Chess_Pieces.Pawn import Pawn
+from Moves import SQUARE_POSITIONS, CAPTURE_FLAG, PROMOTION_FLAG, PROMOTION_SHIFT, END_SHIFT, TACTICAL_MOVES, \
+    QUIET_MOVES, ALL_MOVES, encode_move, decode_move
 
 
 EMPTY_BOARD = [[None for i in range(8)] for c in range(8)]
 
+# Castling rights, stored as a bitmask
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# Steps taken by each type of piece
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+SLIDING_DIRECTIONS = {'R': ROOK_DIRECTIONS, 'B': BISHOP_DIRECTIONS, 'Q': ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+KNIGHT_OFFSETS = ((1, -2), (2, -1), (2, 1), (1, 2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+KING_OFFSETS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+# The squares each colour's pawns capture on from each square
+PAWN_CAPTURES = {colour: [[ray[0] for ray in rays] for rays in piece_rays(((step, -1), (step, 1)), False)]
+                 for colour, step in (('W', 1), ('B', -1))}
+
+# Values used by the evaluation, in tenths of a pawn. They are whole numbers so that the running totals kept by the
+# board never drift away from a full recompute
+EVALUATION_VALUES = {'P': 10, 'N': 30, 'B': 35, 'R': 50, 'Q': 90, 'K': 0}
+CASTLED_BONUS = 10
+CENTRAL_KNIGHT_BONUS = 2
+CENTRAL_PAWN_BONUS = 1
+
+# The castling rights of each colour, and the castling right kept by the rook on each corner
+CASTLING_SIDES = {'W': WHITE_KINGSIDE | WHITE_QUEENSIDE, 'B': BLACK_KINGSIDE | BLACK_QUEENSIDE}
+ROOK_CASTLING_RIGHTS = {(0, 7): WHITE_KINGSIDE, (0, 0): WHITE_QUEENSIDE,
+                        (7, 7): BLACK_KINGSIDE, (7, 0): BLACK_QUEENSIDE}
+
+# Castling rights kept after a move from or to each square, numbered rank * 8 + file
+CASTLING_KEPT = [WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE] * 64
+CASTLING_KEPT[4] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEPT[7] &= ~WHITE_KINGSIDE
+CASTLING_KEPT[0] &= ~WHITE_QUEENSIDE
+CASTLING_KEPT[60] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEPT[63] &= ~BLACK_KINGSIDE
+CASTLING_KEPT[56] &= ~BLACK_QUEENSIDE
+
+# For each colour's castling rights: the file the king moves to, the files between the king and the rook that must be
+# empty, and the files the king passes through, which must not be attacked
+CASTLING_PATHS = {'W': ((WHITE_KINGSIDE, 6, (5, 6), (5, 6)), (WHITE_QUEENSIDE, 2, (1, 2, 3), (3, 2))),
+                  'B': ((BLACK_KINGSIDE, 6, (5, 6), (5, 6)), (BLACK_QUEENSIDE, 2, (1, 2, 3), (3, 2)))}
+
+# The castling right given by each letter of the castling field of a FEN string
+FEN_CASTLING = {'K': WHITE_KINGSIDE, 'Q': WHITE_QUEENSIDE, 'k': BLACK_KINGSIDE, 'q': BLACK_QUEENSIDE}
+
+# The position at the start of a game, as a FEN string
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# The class of the piece for each notation
+PIECE_CLASSES = {'K': King, 'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight, 'P': Pawn}
+
+# Random keys used for Zobrist hashing. A fixed seed keeps the keys the same between runs and processes
+_zobrist_random = random.Random(2023)
+ZOBRIST_PIECES = {colour + notation: [_zobrist_random.getrandbits(64) for _ in range(64)]
+                  for colour in 'WB' for notation in 'KQRBNP'}
+ZOBRIST_CASTLING = [_zobrist_random.getrandbits(64) for _ in range(16)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+# Drawn after the others, so adding them didn't change the keys of positions without an en passant square
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for _ in range(8)]
+
+
+@dataclass
+class MoveRecord:
+    """
+    Everything needed to unmake a move made on a Board, pushed onto Board.moves by make_move
+
+    Instance Attributes:
+        - start_position: The square the piece moved from
+        - end_position: The square the piece moved to
+        - piece: The piece that moved, which is the pawn for a promotion
+        - captured: The piece captured, or None if the move wasn't a capture
+        - captured_index: The index the captured piece had in its colour's list of pieces, or None
+        - promotion: The piece (Q, R, N, B) the pawn was promoted to, or None if it wasn't a promotion
+        - has_moved: The moving piece's has_moved before the move, or None if it has no has_moved
+        - first_move: The moving piece's first_move before the move, or None if it has no first_move
+        - castling_rights: The castling rights of both players before the move, as a bitmask
+        - en_passant: The en passant square before the move, or None
+        - halfmove_clock: The halfmove clock before the move
+        - zobrist_key: The Zobrist key of the position before the move
+        - material: The material of the position before the move
+        - positional: The positional score of the position before the move
+    """
+    __slots__ = ('start_position', 'end_position', 'piece', 'captured', 'captured_index', 'promotion', 'has_moved',
+                 'first_move', 'castling_rights', 'en_passant', 'halfmove_clock', 'zobrist_key', 'material',
+                 'positional')
+
+    start_position: tuple[int, int]
+    end_position: tuple[int, int]
+    piece: Piece
+    captured: Optional[Piece]
+    captured_index: Optional[int]
+    promotion: Optional[str]
+    has_moved: Optional[bool]
+    first_move: Optional[tuple[int, int]]
+    castling_rights: int
+    en_passant: Optional[tuple[int, int]]
+    halfmove_clock: int
+    zobrist_key: int
+    material: int
+    positional: int
+
 
 @dataclass
 class Board:
@@ -27,19 +133,50 @@ class Board:
         - white_pieces: A list of all the white pieces
         - white_king_location: A tuple storing the current location of the white king
         - black_king_location: A tuple storing the current location of the black king
-        - captured_pieces: A list storing all of the captured pieces (used for unmaking moves)
+        - moves: A list of the moves made, each a MoveRecord holding everything needed to unmake it, or None for a
+          null move
+        - turn: The colour whose turn it is to move, 'W' or 'B'
+        - castling: The castling rights of both players as a bitmask of WHITE_KINGSIDE, WHITE_QUEENSIDE,
+          BLACK_KINGSIDE and BLACK_QUEENSIDE, updated as moves are made
+        - en_passant: The square passed over by a pawn that has just moved two squares, if a pawn of the side to move
+          stands beside it to capture en passant, otherwise None
+        - halfmove_clock: The number of moves since the last capture or pawn move, for the fifty-move rule
+        - fullmove_number: The number of the current move, starting at 1 and increased after each of Black's moves
+        - zobrist_key: A 64-bit Zobrist hash of the position, updated incrementally as moves are made
+        - material: The value of White's pieces minus the value of Black's pieces, in tenths of a pawn
+        - positional: White's positional bonuses minus Black's positional bonuses, in tenths of a pawn
+        - legal_moves_cache: Maps (zobrist_key, colour) to the legal moves of colour found in the current position by
+          legal_check_moves. It is emptied whenever the position changes.
+
+    Class Attributes:
+        - debug_evaluation: Whether every change to the position checks material and positional against a full
+          recompute
 
     Representation Invariants:
+        - self.castling == self.compute_castling_rights()
+        - self.zobrist_key == self.compute_zobrist_key()
+        - (self.material, self.positional) == self.compute_evaluation()
     """
+    debug_evaluation: ClassVar[bool] = False
+
     positions: list[list[Optional[Piece]]]
     black_pieces: list[Piece]
     white_pieces: list[Piece]
     white_king_location: tuple[int, int]
     black_king_location: tuple[int, int]
-    captured_pieces: list[Piece]
-    moves: list[tuple[tuple[int, int], tuple[int, int], bool]]
+    moves: list[Optional[MoveRecord]]
+    turn: str
+    castling: int
+    en_passant: Optional[tuple[int, int]]
+    halfmove_clock: int
+    fullmove_number: int
+    zobrist_key: int
+    material: int
+    positional: int
+    legal_moves_cache: dict[tuple[int, str], frozenset[tuple[tuple[int, int], tuple[int, int]]]]
 
-    def __init__(self, position: list[list[Optional[Piece]]]):
+    def __init__(self, position: list[list[Optional[Piece]]], turn: str = 'W',
+                 en_passant: Optional[tuple[int, int]] = None):
 
         if position == EMPTY_BOARD:
             # Set up the board with all the pieces
@@ -58,7 +195,6 @@ class Board:
             self.black_pieces = self.positions[7] + self.positions[6]
             self.white_king_location = (0, 4)
             self.black_king_location = (7, 4)
-            self.captured_pieces = []
             self.moves = []
 
         else:
@@ -66,7 +202,6 @@ class Board:
             self.positions = position
             self.white_pieces = []
             self.black_pieces = []
-            self.captured_pieces = []
             self.moves = []
 
             for row in position:
@@ -78,16 +213,56 @@ class Board:
                         else:
                             self.black_pieces.append(square)
 
-                        if isinstance(square, King) and square.colour == 'W':
-                            self.white_king_location = square.position
-                        elif isinstance(square, King) and square.colour == 'B':
-                            self.black_king_location = square.position
+                        if isinstance(square, King):
+                            if square.colour == 'W':
+                                self.white_king_location = square.position
+                            else:
+                                self.black_king_location = square.position
+
+        self.turn = turn
+        self.castling = self.compute_castling_rights()
+        self.en_passant = en_passant
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.zobrist_key = self.compute_zobrist_key()
+        self.material, self.positional = self.compute_evaluation()
+        self.legal_moves_cache = {}
 
-    def make_move(self, start_position: tuple[int, int], end_position: tuple[int, int]):
+    def make_move(self, start_position: tuple[int, int], end_position: tuple[int, int],
+                  promotion: Optional[str] = None):
         """
-        Move the piece at start_position to end_position
+        Move the piece at start_position to end_position. If the move is a pawn reaching the last rank, promotion
+        is the piece (Q, R, N, B) it is promoted to, or None to leave the promotion to promote_pawn.
         """
         piece = self.positions[start_position[0]][start_position[1]]
+        target = self.positions[end_position[0]][end_position[1]]
+        is_pawn = isinstance(piece, Pawn)
+        if target is None and is_pawn and start_position[1] != end_position[1]:
+            # An en passant capture takes the pawn beside the end square
+            target = self.positions[start_position[0]][end_position[1]]
+        self.legal_moves_cache.clear()
+        castling_rights = self.castling
+        record = MoveRecord(start_position, end_position, piece, target, None, None, getattr(piece, 'has_moved', None),
+                            getattr(piece, 'first_move', None), castling_rights, self.en_passant, self.halfmove_clock,
+                            self.zobrist_key, self.material, self.positional)
+        self.moves.append(record)
+
+        # Remove the moving piece, any captured piece, the old castling rights and en passant square from the
+        # Zobrist key
+        self.turn = 'B' if self.turn == 'W' else 'W'
+        key = self.zobrist_key ^ ZOBRIST_BLACK_TO_MOVE ^ ZOBRIST_CASTLING[castling_rights]
+        key ^= piece_key(piece, start_position) ^ piece_key(piece, end_position)
+        if target is not None:
+            key ^= piece_key(target, target.position)
+        if self.en_passant is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant[1]]
+
+        # Take the moving piece's old positional bonus and any captured piece out of the evaluation
+        positional = self.positional - positional_score(piece)
+        if target is not None:
+            self.material -= material_score(target)
+            positional -= positional_score(target)
+
         piece.make_move(end_position)
 
         # Deal with Castling
@@ -99,6 +274,7 @@ class Board:
                 rook.make_move((end_position[0], 5))
                 piece.has_castled = True
                 self.positions[end_position[0]][5], self.positions[end_position[0]][7] = rook, None
+                key ^= piece_key(rook, (end_position[0], 7)) ^ piece_key(rook, (end_position[0], 5))
 
             elif end_position[1] - start_position[1] == -2:
                 # Queenside Castle
@@ -107,27 +283,45 @@ class Board:
                 rook.make_move((end_position[0], 3))
                 piece.has_castled = True
                 self.positions[end_position[0]][3], self.positions[end_position[0]][0] = rook, None
+                key ^= piece_key(rook, (end_position[0], 0)) ^ piece_key(rook, (end_position[0], 3))
 
         # Update the board
-        self.update_board(piece, end_position, start_position)
+        record.captured_index = self.update_board(piece, end_position, start_position, target)
+        self.en_passant = None
+        if is_pawn and abs(end_position[0] - start_position[0]) == 2 and \
+                en_passant_capturable(self.positions, end_position, 'B' if piece.colour == 'W' else 'W'):
+            self.en_passant = ((start_position[0] + end_position[0]) // 2, end_position[1])
+            key ^= ZOBRIST_EN_PASSANT[end_position[1]]
+        self.halfmove_clock = 0 if is_pawn or target is not None else self.halfmove_clock + 1
+        if piece.colour == 'B':
+            self.fullmove_number += 1
+        # A king or rook leaving its square, or a rook being captured on it, loses the castling rights it gave
+        self.castling = castling_rights & CASTLING_KEPT[start_position[0] * 8 + start_position[1]] & \
+            CASTLING_KEPT[end_position[0] * 8 + end_position[1]]
+        self.zobrist_key = key ^ ZOBRIST_CASTLING[self.castling]
+        self.positional = positional + positional_score(piece)
+
+        if promotion is not None:
+            self.promote_pawn(piece, promotion)
+        elif Board.debug_evaluation:
+            self.check_evaluation()
         # self.print_board()
 
-    def update_board(self, piece: Piece, end_position: tuple[int, int], start_position: tuple[int, int]):
+    def update_board(self, piece: Piece, end_position: tuple[int, int], start_position: tuple[int, int],
+                     piece_to_remove: Optional[Piece] = None) -> Optional[int]:
         """
-        Update the board state to reflect piece moving from start_position to end_position
+        Update the board state to reflect piece moving from start_position to end_position, capturing piece_to_remove
+        if it is given. Return the index that the captured piece had in its colour's list of pieces, or None if it is
+        not a capture.
         """
-
-        if isinstance(self.positions[end_position[0]][end_position[1]], Piece):
-            self.moves.append((start_position, end_position, True))
-            # If it is a Capture, then remove captured piece from list of pieces
-            piece_to_remove = self.positions[end_position[0]][end_position[1]]
-            self.captured_pieces.append(piece_to_remove)
-            if piece.colour == 'W':
-                self.black_pieces.remove(piece_to_remove)
-            else:
-                self.white_pieces.remove(piece_to_remove)
-        else:
-            self.moves.append((start_position, end_position, False))
+        captured_index = None
+        if piece_to_remove is not None:
+            # If it is a Capture, then remove captured piece from the board and list of pieces. It is only off the
+            # end square for an en passant capture.
+            self.positions[piece_to_remove.position[0]][piece_to_remove.position[1]] = None
+            pieces = self.black_pieces if piece.colour == 'W' else self.white_pieces
+            captured_index = pieces.index(piece_to_remove)
+            del pieces[captured_index]
 
         # Move piece from start_position to end_position
         self.positions[end_position[0]][end_position[1]],\
@@ -140,6 +334,8 @@ class Board:
             else:
                 self.black_king_location = piece.position
 
+        return captured_index
+
         # Promote Pawn if at the end
         # if isinstance(piece, Pawn) and \
         #         ((piece.colour == 'W' and end_position[0] == 7) or (piece.colour == 'B' and end_position[0] == 0)):
@@ -171,20 +367,156 @@ class Board:
 
         return moves
 
-    def legal_check_moves(self, colour: str) -> set[tuple[tuple[int, int], tuple[int, int]]]:
-        """
-        Return all the positions that can be legally moved to by a certain colour
+    def legal_check_moves(self, colour: str) -> frozenset[tuple[tuple[int, int], tuple[int, int]]]:
         """
-        moves = set()
-        if colour == 'W':
-            for piece in self.white_pieces:
-                moves.update(piece.legal_check_moves(self.positions))
-        else:
-            for piece in self.black_pieces:
-                moves.update(piece.legal_check_moves(self.positions))
+        Return all the moves that can be legally made by a certain colour.
 
+        The moves are generated once for each position and colour, and kept in legal_moves_cache until a move is made
+        or unmade, so the game, the GUI and the engine can all ask for them in the same turn.
+        """
+        cache_key = (self.zobrist_key, colour)
+        moves = self.legal_moves_cache.get(cache_key)
+        if moves is None:
+            encoded_moves = array('H')
+            self.generate_moves(colour, encoded_moves)
+            moves = frozenset(decode_move(move) for move in encoded_moves)
+            self.legal_moves_cache[cache_key] = moves
         return moves
 
+    def generate_moves(self, colour: str, moves: array, kinds: int = ALL_MOVES):
+        """
+        Fill moves with all the moves that can be legally made by a certain colour, encoded by encode_move. A pawn
+        reaching the last rank gives one move for each piece it can be promoted to. Only captures and promotions are
+        generated if kinds is TACTICAL_MOVES, and only the other moves if it is QUIET_MOVES.
+
+        The checks and pins against the king are found once for the position, then each piece's moves are filtered
+        directly instead of being tried out on a copy of the board. No tuples are made for the moves, so the engine
+        can reuse the same array at each ply of its search.
+        """
+        del moves[:]
+        positions = self.positions
+        pins, check_blocks = self.move_restrictions(colour)
+        opponent = 'B' if colour == 'W' else 'W'
+        step = 8 if colour == 'W' else -8
+        tactical, quiet = kinds & TACTICAL_MOVES, kinds & QUIET_MOVES
+        en_passant = -1
+        if tactical and self.en_passant is not None and self.en_passant[0] == (5 if colour == 'W' else 2):
+            en_passant = self.en_passant[0] * 8 + self.en_passant[1]
+
+        def add_pawn_move(end: int, flags: int):
+            promoting = end >> 3 == 0 or end >> 3 == 7
+            if not (tactical if flags or promoting else quiet):
+                return
+            end_position = SQUARE_POSITIONS[end]
+            if (check_blocks is None or end_position in check_blocks) and (pin is None or end_position in pin):
+                move = start | end << END_SHIFT | flags
+                if promoting:
+                    for index in range(4):
+                        moves.append(move | PROMOTION_FLAG | index << PROMOTION_SHIFT)
+                else:
+                    moves.append(move)
+
+        for piece in self.white_pieces if colour == 'W' else self.black_pieces:
+            position = piece.position
+            start = position[0] * 8 + position[1]
+            notation = piece.notation[1]
+            pin = pins.get(position)
+
+            if notation == 'K':
+                # The king can't move to an attacked square, including one behind it on the line of a check
+                for ray in piece.rays[start]:
+                    end = ray[0]
+                    target = positions[end >> 3][end & 7]
+                    if (quiet if target is None else tactical and target.colour == opponent) and \
+                            not self.square_attacked(SQUARE_POSITIONS[end], opponent, position):
+                        moves.append(start | end << END_SHIFT | (CAPTURE_FLAG if target is not None else 0))
+                if check_blocks is None and quiet:
+                    self.castling_moves(colour, moves)
+
+            elif notation == 'P':
+                single = start + step
+                if 0 <= single < 64 and positions[single >> 3][single & 7] is None:
+                    add_pawn_move(single, 0)
+                    double = single + step
+                    if not piece.has_moved and 0 <= double < 64 and positions[double >> 3][double & 7] is None:
+                        add_pawn_move(double, 0)
+                for end in PAWN_CAPTURES[colour][start]:
+                    target = positions[end >> 3][end & 7]
+                    if target is not None and target.colour == opponent:
+                        add_pawn_move(end, CAPTURE_FLAG)
+                    elif end == en_passant and self.en_passant_legal(piece, SQUARE_POSITIONS[end]):
+                        moves.append(start | end << END_SHIFT | CAPTURE_FLAG)
+
+            else:
+                for ray in piece.rays[start]:
+                    for end in ray:
+                        target = positions[end >> 3][end & 7]
+                        if target is not None and target.colour == colour:
+                            break
+                        end_position = SQUARE_POSITIONS[end]
+                        if (quiet if target is None else tactical) and \
+                                (check_blocks is None or end_position in check_blocks) and \
+                                (pin is None or end_position in pin):
+                            moves.append(start | end << END_SHIFT | (CAPTURE_FLAG if target is not None else 0))
+                        if target is not None:
+                            break
+
+    def legal_moves_from(self, position: tuple[int, int]) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+        """
+        Return all the moves that can be legally made by the piece at position, taken from legal_check_moves
+        """
+        piece = self.positions[position[0]][position[1]]
+        return [move for move in self.legal_check_moves(piece.colour) if move[0] == position]
+
+    def move_restrictions(self, colour: str) -> tuple[dict[tuple[int, int], set[tuple[int, int]]],
+                                                      Optional[set[tuple[int, int]]]]:
+        """
+        Return (pins, check_blocks) for the king of colour, where
+            - pins maps the position of each piece pinned to the king to the squares it can move to without leaving
+              the pin, which are the squares between the king and the pinning piece, and the pinning piece's square
+            - check_blocks is None if the king is not in check. Otherwise it is the squares that another piece can
+              move to in order to capture or block the checking piece, which is empty if it is double check.
+        """
+        positions = self.positions
+        rank, file = self.get_king_location(colour)
+        pins = {}
+        check_blocks = None
+
+        # Look along each line from the king for sliding pieces giving check or pinning a piece to the king
+        for directions, slider in ((ROOK_DIRECTIONS, 'R'), (BISHOP_DIRECTIONS, 'B')):
+            for rank_step, file_step in directions:
+                line = []
+                pinned = None
+                r, f = rank + rank_step, file + file_step
+                while 0 <= r <= 7 and 0 <= f <= 7:
+                    line.append((r, f))
+                    square = positions[r][f]
+                    if square is not None:
+                        if square.colour == colour:
+                            if pinned is not None:
+                                break
+                            pinned = (r, f)
+                        else:
+                            if square.notation[1] == slider or square.notation[1] == 'Q':
+                                if pinned is not None:
+                                    pins[pinned] = set(line)
+                                else:
+                                    check_blocks = add_check(check_blocks, line)
+                            break
+                    r, f = r + rank_step, f + file_step
+
+        # Knights and pawns can only give check by standing next to the king
+        pawn_rank = rank + 1 if colour == 'W' else rank - 1
+        for offsets, notation in ((KNIGHT_OFFSETS, 'N'), (((pawn_rank - rank, -1), (pawn_rank - rank, 1)), 'P')):
+            for rank_step, file_step in offsets:
+                r, f = rank + rank_step, file + file_step
+                if 0 <= r <= 7 and 0 <= f <= 7:
+                    square = positions[r][f]
+                    if square is not None and square.colour != colour and square.notation[1] == notation:
+                        check_blocks = add_check(check_blocks, [(r, f)])
+
+        return (pins, check_blocks)
+
     def king_in_check(self, colour: str) -> bool:
         """
         Return whether the king of colour is in check or not.
@@ -193,10 +525,67 @@ class Board:
 
         if colour == 'W':
             # Return if the white king's current location is attacked by any of black's pieces
-            return king_location in self.all_legal_moves('B')
+            return self.square_attacked(king_location, 'B')
         else:
             # Return if the black king's current location is attacked by any of white's pieces
-            return king_location in self.all_legal_moves('W')
+            return self.square_attacked(king_location, 'W')
+
+    def square_attacked(self, square: tuple[int, int], colour: str, ignore: Optional[tuple[int, int]] = None) -> bool:
+        """
+        Return whether square is attacked by any of colour's pieces. The piece at ignore, if given, is treated as if
+        it was not on the board.
+
+        Instead of generating the moves of colour's pieces, look outwards from square for a piece that could attack
+        it, stopping at the first one found.
+        """
+        positions = self.positions
+        rank, file = square
+
+        # Look along each line from the square for the first piece in the way
+        for directions, slider in ((ROOK_DIRECTIONS, colour + 'R'), (BISHOP_DIRECTIONS, colour + 'B')):
+            for rank_step, file_step in directions:
+                r, f = rank + rank_step, file + file_step
+                while 0 <= r <= 7 and 0 <= f <= 7:
+                    piece = positions[r][f]
+                    if piece is not None and (r, f) != ignore:
+                        if piece.notation == slider or piece.notation == colour + 'Q':
+                            return True
+                        break
+                    r, f = r + rank_step, f + file_step
+
+        # Look for knights, pawns and the king on the squares around
+        pawn_rank_step = -1 if colour == 'W' else 1
+        for offsets, notation in ((KNIGHT_OFFSETS, colour + 'N'), (KING_OFFSETS, colour + 'K'),
+                                  (((pawn_rank_step, -1), (pawn_rank_step, 1)), colour + 'P')):
+            for rank_step, file_step in offsets:
+                r, f = rank + rank_step, file + file_step
+                if 0 <= r <= 7 and 0 <= f <= 7:
+                    piece = positions[r][f]
+                    if piece is not None and piece.notation == notation:
+                        return True
+
+        return False
+
+    def piece_at(self, position: tuple[int, int]) -> Optional[str]:
+        """
+        Return the notation of the piece at position, or None if the square is empty
+        """
+        piece = self.positions[position[0]][position[1]]
+        if piece is None:
+            return None
+        return piece.notation
+
+    def piece_list(self) -> list[tuple[str, tuple[int, int]]]:
+        """
+        Return the notation and position of every piece on the board
+        """
+        return [(piece.notation, piece.position) for piece in self.white_pieces + self.black_pieces]
+
+    def piece_count(self) -> int:
+        """
+        Return the number of pieces on the board
+        """
+        return len(self.white_pieces) + len(self.black_pieces)
 
     def get_king_location(self, colour: str) -> tuple[int, int]:
         """
@@ -214,6 +603,7 @@ class Board:
 
         rank, file = pawn_to_promote.position
         board = self.positions
+        self.legal_moves_cache.clear()
 
         # Update board position to replace pawn_to_promote with the new piece
         if new_piece == 'Q':
@@ -231,13 +621,126 @@ class Board:
         elif new_piece == 'B':
             board[rank][file] = Bishop(pawn_to_promote.colour, pawn_to_promote.position)
 
-        # Update list of pieces
-        if pawn_to_promote.colour == 'W':
-            self.white_pieces.remove(pawn_to_promote)
-            self.white_pieces.append(self.positions[rank][file])
-        else:
-            self.black_pieces.remove(pawn_to_promote)
-            self.black_pieces.append(self.positions[rank][file])
+        self.zobrist_key ^= piece_key(pawn_to_promote, (rank, file)) ^ piece_key(board[rank][file], (rank, file))
+        self.material += material_score(board[rank][file]) - material_score(pawn_to_promote)
+        self.positional += positional_score(board[rank][file]) - positional_score(pawn_to_promote)
+
+        # Update list of pieces, keeping the new piece in the pawn's place
+        pieces = self.white_pieces if pawn_to_promote.colour == 'W' else self.black_pieces
+        pieces[pieces.index(pawn_to_promote)] = board[rank][file]
+
+        # Let unmake_move turn the piece back into the pawn
+        if self.moves and self.moves[-1] is not None and self.moves[-1].piece is pawn_to_promote:
+            self.moves[-1].promotion = board[rank][file].notation[1]
+
+        if Board.debug_evaluation:
+            self.check_evaluation()
+
+    def snapshot(self) -> tuple[str, str, int, str, Optional[tuple[int, int]]]:
+        """
+        Return a compact copy of the position that is cheap to send to another process, in the form
+        (placement, turn, castling_rights, castled, en_passant), where placement holds one character for each square
+        from A1 to H8 ('.' if empty, upper case for White and lower case for Black) and castled holds the colours that
+        have castled.
+
+        >>> Board(EMPTY_BOARD).snapshot()[0][:16]
+        'RNBQKBNRPPPPPPPP'
+        """
+        placement = []
+        for row in self.positions:
+            for piece in row:
+                if piece is None:
+                    placement.append('.')
+                elif piece.colour == 'W':
+                    placement.append(piece.notation[1])
+                else:
+                    placement.append(piece.notation[1].lower())
+
+        castled = ''.join(piece.colour for piece in self.white_pieces + self.black_pieces
+                          if isinstance(piece, King) and piece.has_castled)
+        return (''.join(placement), self.turn, self.castling, castled, self.en_passant)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: tuple[str, str, int, str, Optional[tuple[int, int]]]) -> Board:
+        """
+        Return a new Board holding the position in snapshot, which was returned by Board.snapshot()
+        """
+        placement, turn, castling_rights, castled, en_passant = snapshot
+        position = [[None] * 8 for _ in range(8)]
+        for square, symbol in enumerate(placement):
+            if symbol != '.':
+                rank, file = square >> 3, square & 7
+                position[rank][file] = set_up_piece(symbol, (rank, file), castling_rights, castled)
+        return cls(position, turn, en_passant)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> Board:
+        """
+        Return a new Board holding the position in the Forsyth-Edwards Notation (FEN) string fen. Fields missing from
+        the end default to White to move, no castling rights or en passant square, and the move counters of a new game.
+
+        An en passant square is only kept if a pawn of the side to move could capture onto it, as make_move only sets
+        one then, so that the position has the same Zobrist key however it was reached.
+
+        >>> Board.from_fen(STARTING_FEN).snapshot() == Board(EMPTY_BOARD).snapshot()
+        True
+        """
+        fields = fen.split()
+        turn = fields[1].upper() if len(fields) > 1 else 'W'
+        castling_rights = 0
+        if len(fields) > 2:
+            for symbol in fields[2]:
+                castling_rights |= FEN_CASTLING.get(symbol, 0)
+
+        # FEN lists the ranks from the 8th down
+        position = [[None] * 8 for _ in range(8)]
+        rank, file = 7, 0
+        for symbol in fields[0]:
+            if symbol == '/':
+                rank, file = rank - 1, 0
+            elif symbol in '12345678':
+                file += int(symbol)
+            else:
+                position[rank][file] = set_up_piece(symbol, (rank, file), castling_rights, '')
+                file += 1
+
+        en_passant = None
+        if len(fields) > 3 and fields[3] != '-':
+            en_passant = coordinate_to_position(fields[3])
+            pawn_position = (en_passant[0] + (-1 if turn == 'W' else 1), en_passant[1])
+            if not en_passant_capturable(position, pawn_position, turn):
+                en_passant = None
+
+        board = cls(position, turn, en_passant)
+        if len(fields) > 4:
+            board.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            board.fullmove_number = int(fields[5])
+        return board
+
+    def to_fen(self) -> str:
+        """
+        Return the position in Forsyth-Edwards Notation (FEN), the inverse of Board.from_fen
+
+        >>> Board(EMPTY_BOARD).to_fen() == STARTING_FEN
+        True
+        """
+        ranks = []
+        for row in reversed(self.positions):
+            rank, empty = '', 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank, empty = rank + str(empty), 0
+                rank += piece.notation[1] if piece.colour == 'W' else piece.notation[1].lower()
+            ranks.append(rank + str(empty) if empty else rank)
+
+        castling = ''.join(symbol for symbol, right in FEN_CASTLING.items() if self.castling & right) or '-'
+        en_passant = position_to_coordinate(self.en_passant) if self.en_passant is not None else '-'
+        return f"{'/'.join(ranks)} {self.turn.lower()} {castling} {en_passant} {self.halfmove_clock} " \
+               f"{self.fullmove_number}"
 
     def clear_board(self):
         """
@@ -246,39 +749,65 @@ class Board:
 
         self.__init__(EMPTY_BOARD)
 
+    def make_null_move(self):
+        """
+        Pass the turn to the other player without moving a piece. The engine searches these 'null moves' to prune
+        positions that are good enough even if the side to move does nothing. Undone by unmake_move like any move.
+
+        Any en passant square is left as it is. It can only be captured onto by the side that passed, and is cleared by
+        the next real move.
+        """
+        self.moves.append(None)
+        self.turn = 'B' if self.turn == 'W' else 'W'
+        self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+        self.legal_moves_cache.clear()
+
     def unmake_move(self):
         """
-        Undoes a move that took a piece from start position to end position
+        Undo the last move made, restoring the position exactly from its MoveRecord
         """
-        start_position, end_position, capture = self.moves.pop()
-        piece = self.positions[end_position[0]][end_position[1]]
+        self.legal_moves_cache.clear()
+        record = self.moves.pop()
+        self.turn = 'B' if self.turn == 'W' else 'W'
+        if record is None:
+            # Undo a null move
+            self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+            return
+
+        start_position, end_position, piece = record.start_position, record.end_position, record.piece
+        pieces = self.white_pieces if piece.colour == 'W' else self.black_pieces
+        if record.promotion is not None:
+            # Replace the promoted piece with the pawn it came from
+            pieces[pieces.index(self.positions[end_position[0]][end_position[1]])] = piece
+
         piece.position = start_position
+        if record.has_moved is not None:
+            piece.has_moved = record.has_moved
+            piece.first_move = record.first_move
 
         self.positions[end_position[0]][end_position[1]], \
             self.positions[start_position[0]][start_position[1]] = None, piece
 
-        if (isinstance(piece, Pawn) or isinstance(piece, King) or isinstance(piece, Rook)) and piece.first_move == end_position:
-            piece.has_moved = False
-            piece.first_move = ()
+        captured = record.captured
+        if captured is not None:
+            # Put the captured piece back on its square, which is off the end square for an en passant capture, and
+            # where it was in its list
+            self.positions[captured.position[0]][captured.position[1]] = captured
+            opponent_pieces = self.black_pieces if piece.colour == 'W' else self.white_pieces
+            opponent_pieces.insert(record.captured_index, captured)
 
         if isinstance(piece, King):
-            if end_position[1] - start_position[1] == 2:
-                rook = self.positions[end_position[0]][5]
-                rook.position = (end_position[0], 7)
+            if abs(end_position[1] - start_position[1]) == 2:
+                # Put the rook back in its corner. It can't have moved before castling.
+                rank = end_position[0]
+                rook_file, castled_file = (7, 5) if end_position[1] > start_position[1] else (0, 3)
+                rook = self.positions[rank][castled_file]
                 assert isinstance(rook, Rook)
+                rook.position = (rank, rook_file)
                 rook.has_moved = False
+                rook.first_move = ()
                 piece.has_castled = False
-                piece.has_moved = False
-                self.positions[end_position[0]][5], self.positions[end_position[0]][7] = None, rook
-
-            elif end_position[1] - start_position[1] == -2:
-                # Queenside Castle
-                rook = self.positions[end_position[0]][3]
-                rook.position = (end_position[0], 0)
-                assert isinstance(rook, Rook)
-                rook.has_moved = False
-                piece.has_castled = False
-                self.positions[end_position[0]][3], self.positions[end_position[0]][0] = None, rook
+                self.positions[rank][castled_file], self.positions[rank][rook_file] = None, rook
 
             # Update King Location
             if piece.colour == 'W':
@@ -286,16 +815,93 @@ class Board:
             else:
                 self.black_king_location = piece.position
 
-        if len(self.captured_pieces) > 0 and capture:
-            last_captured_piece = self.captured_pieces.pop()
+        self.castling, self.en_passant, self.halfmove_clock = \
+            record.castling_rights, record.en_passant, record.halfmove_clock
+        if piece.colour == 'B':
+            self.fullmove_number -= 1
+        self.zobrist_key, self.material, self.positional = record.zobrist_key, record.material, record.positional
+        if Board.debug_evaluation:
+            self.check_evaluation()
 
-            # Then the last move was a capture
-            self.positions[end_position[0]][end_position[1]] = last_captured_piece
+    def en_passant_legal(self, pawn: Pawn, end_position: tuple[int, int]) -> bool:
+        """
+        Return whether pawn capturing en passant on end_position leaves its king safe.
 
-            if piece.colour == 'W':
-                self.black_pieces.append(last_captured_piece)
-            else:
-                self.white_pieces.append(last_captured_piece)
+        Both pawns leave the rank they were on, which can uncover an attack along it that the pins don't show, so the
+        capture is tried out on the squares instead.
+        """
+        positions = self.positions
+        (rank, file), captured_file = pawn.position, end_position[1]
+        captured = positions[rank][captured_file]
+        positions[rank][file] = positions[rank][captured_file] = None
+        positions[end_position[0]][captured_file] = pawn
+        legal = not self.square_attacked(self.get_king_location(pawn.colour), captured.colour)
+        positions[rank][file], positions[rank][captured_file] = pawn, captured
+        positions[end_position[0]][captured_file] = None
+        return legal
+
+    def castling_moves(self, colour: str, moves: array):
+        """
+        Add the legal castling moves for colour to moves, encoded by encode_move, when its king is not in check.
+
+        The castling rights already say that the king and rook are on their squares and haven't moved, so only the
+        squares between them and the squares the king passes through are looked at.
+        """
+        rank = 0 if colour == 'W' else 7
+        row = self.positions[rank]
+        opponent = 'B' if colour == 'W' else 'W'
+        for right, king_file, empty_files, transit_files in CASTLING_PATHS[colour]:
+            if self.castling & right and all(row[file] is None for file in empty_files) and \
+                    not any(self.square_attacked((rank, file), opponent) for file in transit_files):
+                moves.append(encode_move((rank, 4), (rank, king_file)))
+
+    def compute_castling_rights(self) -> int:
+        """
+        Return the castling rights of both players as a bitmask, calculated from scratch from which kings and rooks
+        have not moved yet
+        """
+        rights = 0
+        for rank, colour, kingside, queenside in ((0, 'W', WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                                                   (7, 'B', BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            king = self.positions[rank][4]
+            if isinstance(king, King) and king.colour == colour and not king.has_moved:
+                king_rook, queen_rook = self.positions[rank][7], self.positions[rank][0]
+                if isinstance(king_rook, Rook) and king_rook.colour == colour and not king_rook.has_moved:
+                    rights |= kingside
+                if isinstance(queen_rook, Rook) and queen_rook.colour == colour and not queen_rook.has_moved:
+                    rights |= queenside
+        return rights
+
+    def compute_zobrist_key(self) -> int:
+        """
+        Return the Zobrist key of the current position, calculated from scratch
+        """
+        key = ZOBRIST_CASTLING[self.castling]
+        if self.turn == 'B':
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        if self.en_passant is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant[1]]
+        for piece in self.white_pieces + self.black_pieces:
+            key ^= piece_key(piece, piece.position)
+        return key
+
+    def compute_evaluation(self) -> tuple[int, int]:
+        """
+        Return (material, positional) for the current position, calculated from scratch
+        """
+        material, positional = 0, 0
+        for piece in self.white_pieces + self.black_pieces:
+            material += material_score(piece)
+            positional += positional_score(piece)
+        return (material, positional)
+
+    def check_evaluation(self):
+        """
+        Raise an AssertionError if the running evaluation is different from a full recompute
+        """
+        expected = self.compute_evaluation()
+        assert (self.material, self.positional) == expected, \
+            f'Running evaluation {(self.material, self.positional)} does not match the full recompute {expected}'
 
     # def check_castle_legality(self, colour: str):
     #     """
@@ -340,7 +946,83 @@ class Board:
         print("    A    B    C    D    E    F    G    H")
 
 
-# No longer used
+def set_up_piece(symbol: str, position: tuple[int, int], castling_rights: int, castled: str) -> Piece:
+    """
+    Return a new piece for the FEN symbol at position (upper case for White and lower case for Black), working out
+    whether it has moved from the position and castling rights, and whether a King has castled from castled
+    """
+    colour = 'W' if symbol < 'a' else 'B'
+    notation = symbol.upper()
+    piece = PIECE_CLASSES[notation](colour, position)
+    rank = position[0]
+    home_rank = 0 if colour == 'W' else 7
+    if notation == 'P':
+        piece.has_moved = rank != (1 if colour == 'W' else 6)
+    elif notation == 'K':
+        piece.has_castled = colour in castled
+        piece.has_moved = position != (home_rank, 4) or not castling_rights & CASTLING_SIDES[colour]
+    elif notation == 'R':
+        piece.has_moved = rank != home_rank or not castling_rights & ROOK_CASTLING_RIGHTS.get(position, 0)
+    return piece
+
+
+def en_passant_capturable(positions: list[list[Optional[Piece]]], pawn_position: tuple[int, int], colour: str) \
+        -> bool:
+    """
+    Return whether a pawn of colour stands beside the square pawn_position, so that it could capture a pawn that has
+    just moved two squares to there en passant
+    """
+    rank, file = pawn_position
+    row = positions[rank]
+    return any(0 <= beside <= 7 and row[beside] is not None and row[beside].notation == colour + 'P'
+               for beside in (file - 1, file + 1))
+
+
+def piece_key(piece: Piece, position: tuple[int, int]) -> int:
+    """
+    Return the Zobrist key of piece standing on position
+    """
+    return ZOBRIST_PIECES[piece.notation][position[0] * 8 + position[1]]
+
+
+def add_check(check_blocks: Optional[set[tuple[int, int]]],
+              squares: list[tuple[int, int]]) -> set[tuple[int, int]]:
+    """
+    Return the squares that stop every check, once a new check that is stopped by moving to one of squares is found
+    """
+    if check_blocks is None:
+        return set(squares)
+    # A piece can't stop two checks at once
+    return set()
+
+
+def material_score(piece: Piece) -> int:
+    """
+    Return the value of piece, positive for White and negative for Black
+    """
+    value = EVALUATION_VALUES[piece.notation[1]]
+    return value if piece.colour == 'W' else -value
+
+
+def positional_score(piece: Piece) -> int:
+    """
+    Return the positional bonus of piece, positive for White and negative for Black. A castled king, a knight on
+    one of the centre files and a pawn that has moved on one of the centre files each get a bonus.
+    """
+    bonus = 0
+    kind = piece.notation[1]
+    if kind == 'K':
+        if piece.has_castled:
+            bonus = CASTLED_BONUS
+    elif kind == 'N':
+        if 2 <= piece.position[1] <= 5:
+            bonus = CENTRAL_KNIGHT_BONUS
+    elif kind == 'P':
+        if piece.has_moved and 2 <= piece.position[1] <= 5:
+            bonus = CENTRAL_PAWN_BONUS
+    return bonus if piece.colour == 'W' else -bonus
+
+
 def coordinate_to_position(coordinate: str) -> tuple[int, int]:
     """
     Convert chess board coordinates to a usable tuple
@@ -4,17 +4,22 @@ Contains Info about Bishop
 
 from __future__ import annotations
 from dataclasses import dataclass
-from Chess_Pieces.Pieces import Piece
+from Chess_Pieces.Pieces import Piece, piece_rays
 
+# Directions that a Bishop moves in
+BISHOP_DIRECTIONS = ((1, 1), (-1, -1), (-1, 1), (1, -1))
 
-@dataclass
+
+@dataclass(eq=False)
 class Bishop(Piece):
     """
     A Class representing a Bishop
     """
+    __slots__ = ()
+    possible_moves = tuple((x * rank_step, x * file_step) for rank_step, file_step in BISHOP_DIRECTIONS
+                           for x in range(1, 8))
+    rays = piece_rays(BISHOP_DIRECTIONS, True)
 
     def __init__(self, colour, position):
         super().__init__(colour, position)
         self.notation = self.colour + 'B'
-        self.possible_moves = [(x, x) for x in range(1, 8)] + [(-x, -x) for x in range(1, 8)] + \
-                              [(-x, x) for x in range(1, 8)] + [(x, -x) for x in range(1, 8)]
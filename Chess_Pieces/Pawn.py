@@ -12,11 +12,17 @@ from Chess_Pieces.Bishop import Bishop
 from Chess_Pieces.Knight import Knight
 
 
-@dataclass
+# The steps a pawn of each colour can take: one and two squares forward, then its two captures
+PAWN_MOVES = {'W': ((1, 0), (2, 0), (1, 1), (1, -1)), 'B': ((-1, 0), (-2, 0), (-1, 1), (-1, -1))}
+
+
+@dataclass(eq=False)
 class Pawn(Piece):
     """
     A Class representing a Pawn
     """
+    __slots__ = ('has_moved', 'first_move')
+
     has_moved: bool
     first_move: tuple[int, int]
 
@@ -25,10 +31,13 @@ class Pawn(Piece):
         self.notation = self.colour + 'P'
         self.has_moved = False
         self.first_move = tuple()
-        if self.colour == 'W':
-            self.possible_moves = [(1, 0), (2, 0), (1, 1), (1, -1)]
-        else:
-            self.possible_moves = [(-1, 0), (-2, 0), (-1, 1), (-1, -1)]
+
+    @property
+    def possible_moves(self) -> tuple[tuple[int, int], ...]:
+        """
+        The steps the pawn can take, which depend on its colour
+        """
+        return PAWN_MOVES[self.colour]
 
     def get_legal_moves(self, board: list[list[Optional[Piece]]]) -> list[tuple]:
         """
@@ -4,10 +4,38 @@ Contains Info about Chess Pieces
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional
+from typing import ClassVar, Optional
+from Moves import SQUARE_POSITIONS
 
 
-@dataclass
+def piece_rays(steps: tuple[tuple[int, int], ...], sliding: bool) -> list[list[list[int]]]:
+    """
+    Return, for each square numbered rank * 8 + file, the lines of squares reached from it by each of the steps. A
+    sliding piece keeps taking the same step to the edge of the board, and any other piece's line is a single square.
+
+    >>> piece_rays(((1, 2),), False)[0]
+    [[10]]
+    >>> piece_rays(((0, 1),), True)[5]
+    [[6, 7]]
+    """
+    table = []
+    for square in range(64):
+        rays = []
+        for rank_step, file_step in steps:
+            ray = []
+            rank, file = (square >> 3) + rank_step, (square & 7) + file_step
+            while 0 <= rank <= 7 and 0 <= file <= 7:
+                ray.append(rank * 8 + file)
+                if not sliding:
+                    break
+                rank, file = rank + rank_step, file + file_step
+            if ray:
+                rays.append(ray)
+        table.append(rays)
+    return table
+
+
+@dataclass(eq=False)
 class Piece:
     """
     A parent class for a piece
@@ -16,16 +44,25 @@ class Piece:
         - position: The current position of the piece as a tuple representing the coordinates of the square
         - colour: The colour (W or B) of the piece
         - notation: The piece's colour, followed by its notation (K, Q, R, N, B, P)
-        - possible_moves: The possible moves that can be made by the piece
 
+    Class Attributes:
+        - possible_moves: The steps that can be taken by the type of piece, in order along each line
+        - rays: For each square, numbered rank * 8 + file, the lines of squares the type of piece can move along
+          from it, worked out once when the module is imported
+
+    Pieces are created for every copy of a board, so they use __slots__ and share their move tables through the
+    class rather than building their own.
 
     Representation Invariants:
         - colour == 'W' or colour == 'B'
     """
+    __slots__ = ('position', 'colour', 'notation')
+    possible_moves: ClassVar[tuple[tuple[int, int], ...]] = ()
+    rays: ClassVar[list[list[list[int]]]] = []
+
     position: tuple[int, int]
     colour: str
     notation: str
-    possible_moves: list[tuple[int, int]]
 
     def __init__(self, colour, position):
         """
@@ -40,23 +77,15 @@ class Piece:
         """
         legal_moves = []
         rank, file = self.position
-        i = 0
-
-        while i < len(self.possible_moves):
-
-            move = self.possible_moves[i]
-            # Legal move if move is within board boundaries and no piece on the square
-            if 0 <= move[0] + rank <= 7 and 0 <= move[1] + file <= 7 and board[move[0] + rank][move[1] + file] is None:
-                legal_moves.append((move[0] + rank, move[1] + file))
-                i += 1
-            else:
-                # The piece can no longer move in the same direction
-                if 0 <= move[0] + rank <= 7 and 0 <= move[1] + file <= 7 and\
-                        board[move[0] + rank][move[1] + file].colour != self.colour:
-                    # It is a capture if within board and piece of opposite colour on the square.
-                    legal_moves.append((move[0] + rank, move[1] + file))
-
-                i = 7 * (1 + i // 7)
+        for ray in self.rays[rank * 8 + file]:
+            for square in ray:
+                piece = board[square >> 3][square & 7]
+                # Legal move if there is no piece on the square, or a capture if it is a piece of the opposite colour
+                if piece is None or piece.colour != self.colour:
+                    legal_moves.append(SQUARE_POSITIONS[square])
+                if piece is not None:
+                    # The piece can no longer move in the same direction
+                    break
 
         return legal_moves
 
@@ -64,26 +93,7 @@ class Piece:
         """
         Return a list of all the positions, considering checks, that the piece can legally move to
         """
-        moves = []
-        position = self.position
-
-        for move in self.get_legal_moves(board):
-            rank, file = position
-
-            # For each position the piece is looking at, create a copy board in which the potential move is made
-            copy_positions = [row[:] for row in board]
-            copy_positions[move[0]][move[1]], copy_positions[rank][file] = self, None
-            self.position = move
-            copy_board = Board.Board(copy_positions)
-
-            # If making that move would not put the king in check, it is a legal move
-            if not copy_board.king_in_check(self.colour):
-                moves.append((position, move))
-
-            # Reset the piece's position
-            self.position = position
-
-        return moves
+        return Board.Board(board).legal_moves_from(self.position)
 
     def make_move(self, target: tuple[int, int]):
         """
@@ -4,19 +4,20 @@ Contains Info about Queens
 
 from __future__ import annotations
 from dataclasses import dataclass
-from Chess_Pieces.Pieces import Piece
+from Chess_Pieces.Pieces import Piece, piece_rays
+from Chess_Pieces.Rook import Rook, ROOK_DIRECTIONS
+from Chess_Pieces.Bishop import Bishop, BISHOP_DIRECTIONS
 
 
-@dataclass
+@dataclass(eq=False)
 class Queen(Piece):
     """
     A Class representing a Queen
     """
+    __slots__ = ()
+    possible_moves = Rook.possible_moves + Bishop.possible_moves
+    rays = piece_rays(ROOK_DIRECTIONS + BISHOP_DIRECTIONS, True)
 
     def __init__(self, colour, position):
         super().__init__(colour, position)
         self.notation = self.colour + 'Q'
-        self.possible_moves = [(y, 0) for y in range(1, 8)] + [(-y, 0) for y in range(1, 8)] + \
-                              [(0, x) for x in range(1, 8)] + [(0, -x) for x in range(1, 8)] + \
-                              [(x, x) for x in range(1, 8)] + [(-x, -x) for x in range(1, 8)] + \
-                              [(-x, x) for x in range(1, 8)] + [(x, -x) for x in range(1, 8)]
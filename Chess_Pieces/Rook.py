@@ -4,14 +4,22 @@ Contains Info about Rooks
 
 from __future__ import annotations
 from dataclasses import dataclass
-from Chess_Pieces.Pieces import Piece
+from Chess_Pieces.Pieces import Piece, piece_rays
 
+# Directions that a Rook moves in
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
 
-@dataclass
+
+@dataclass(eq=False)
 class Rook(Piece):
     """
     A Class representing a Rook
     """
+    __slots__ = ('has_moved', 'first_move')
+    possible_moves = tuple((y * rank_step, y * file_step) for rank_step, file_step in ROOK_DIRECTIONS
+                           for y in range(1, 8))
+    rays = piece_rays(ROOK_DIRECTIONS, True)
+
     has_moved: bool
     first_move: tuple[int, int]
 
@@ -20,8 +28,6 @@ class Rook(Piece):
         self.notation = self.colour + 'R'
         self.has_moved = False
         self.first_move = tuple()
-        self.possible_moves = [(y, 0) for y in range(1, 8)] + [(-y, 0) for y in range(1, 8)] + \
-                              [(0, x) for x in range(1, 8)] + [(0, -x) for x in range(1, 8)]
 
     def make_move(self, destination: tuple[int, int]):
         """
@@ -3,56 +3,420 @@ Contains Info about Chess Engines
 """
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
 import random
-from Board import Board, Pawn, Queen, Rook, Knight, Bishop, King
+import time
+from typing import Callable, Iterator, Optional
+from Board import Board
+from BitBoard import BitBoard
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from Tablebase import Tablebase, TABLEBASE, MAX_PIECES, MAX_PLIES, decode_value
+from Moves import SQUARES_MASK, END_SHIFT, CAPTURE_FLAG, PROMOTION_FLAG, SQUARE_POSITIONS, TACTICAL_MOVES, \
+    QUIET_MOVES, encode_move, decode_move, move_promotion, is_underpromotion
 
 PIECE_VALUES = {'P': 1, 'N': 3, 'B': 3.5, 'R': 5, 'Q': 9, 'K': 0}
 
+# Half of the smallest difference between two evaluations, used to keep equally good root moves inside the window
+TIE_MARGIN = 0.05
+
+# Number of nodes searched between checks of the search budget
+BUDGET_CHECK_INTERVAL = 32
+
+# Number of quiet moves remembered at each ply for causing a cutoff
+KILLER_SLOTS = 2
+
+# Whether the search prunes positions that are still good enough after passing the turn, and how much shallower
+# that null move search is than the normal one. It is only tried with at least NULL_MOVE_MIN_DEPTH moves to search.
+USE_NULL_MOVE_PRUNING = True
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# Width of the windows of null move searches and of the principal variation search of moves after the first,
+# which only have to show whether the score is beyond a bound
+NULL_WINDOW = 0.01
+
+# Half the width of the window around the last score that each deeper search of iterative_deepening starts with
+ASPIRATION_WINDOW = 0.5
+
+# Whether the search reduces the depth of quiet moves ordered late, after the first LATE_MOVE_INDEX moves of a
+# position with at least LATE_MOVE_MIN_DEPTH moves to search. Moves that beat alpha are searched again at full depth.
+USE_LATE_MOVE_REDUCTIONS = True
+LATE_MOVE_REDUCTION = 1
+LATE_MOVE_INDEX = 3
+LATE_MOVE_MIN_DEPTH = 3
+
+# Score of checkmate, less one for each ply from the root of the search until it is delivered
+CHECKMATE = 999
+
+# Score of a position won according to the endgame tables, less a hundredth of a pawn for each ply from the root of
+# the search until mate. It is below any checkmate the search finds, so a mate is still preferred to trading down
+# into the tables, but above any evaluation of material.
+TABLEBASE_WIN = 500
+# Scores at least this far from zero are proven by the endgame tables or a checkmate, rather than estimated. The
+# tables are reached at most MAX_PLIES plies from the root.
+PROVEN_SCORE = TABLEBASE_WIN - 2 * MAX_PLIES / 100
+
+
+def plies_to_mate(score: float) -> Optional[int]:
+    """
+    Return the number of plies from the root of the search until the checkmate that a proven score is won or lost by,
+    or None if the score isn't proven
+
+    >>> plies_to_mate(CHECKMATE - 3)
+    3
+    >>> plies_to_mate(-(TABLEBASE_WIN - 0.12))
+    12
+    >>> plies_to_mate(2.5) is None
+    True
+    """
+    if abs(score) > TABLEBASE_WIN:
+        return round(CHECKMATE - abs(score))
+    if abs(score) >= PROVEN_SCORE:
+        return round((TABLEBASE_WIN - abs(score)) * 100)
+    return None
+
+
+def shift_proven_score(score: float, plies: int) -> float:
+    """
+    Return a proven score as it is measured from a position plies further from the root of the search, which is
+    that many plies closer to the checkmate. Other scores are returned unchanged.
+
+    >>> shift_proven_score(CHECKMATE - 5, 2)
+    996
+    >>> shift_proven_score(-(CHECKMATE - 5), 2)
+    -996
+    """
+    if abs(score) > TABLEBASE_WIN:
+        shift = plies
+    elif abs(score) >= PROVEN_SCORE:
+        shift = plies / 100
+    else:
+        return score
+    return score + shift if score > 0 else score - shift
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time or node budget has run out
+    """
+
 
 @dataclass
 class Engine2:
     """
     A Chess Engine
 
+    Instance Attributes:
+        - board: The board that the engine searches on, either the Board given or a BitBoard copy of it
+        - table: The transposition table storing the results of positions already searched
+        - nodes: The number of positions visited by the last search
+        - quiescence_nodes: The number of those positions that were visited by the quiescence search
+        - generated_moves: The number of moves generated by the last search. Moves that are never generated because
+          an earlier one caused a cutoff aren't counted.
+        - deadline: The time.perf_counter() value at which the current search must stop, or None if there is no limit
+        - node_limit: The number of nodes after which the current search must stop, or None if there is no limit
+        - depth_reached: The last depth fully searched by iterative_deepening
+        - iterations: The (move, score) found by each depth fully searched by iterative_deepening
+        - root_moves: The only moves searched from the root, or None to search every legal move
+        - stopped: Whether the search has been asked to stop by stop(), possibly from another thread
+        - tablebase: The endgame tables that positions with few enough pieces are looked up in, or None
+        - root_ply: The number of moves made on the board before the current search started
+        - move_lists: For each ply from the root, the arrays that the captures and promotions, and the quiet moves,
+          of the position searched there are generated into, so the search doesn't make new move lists at every node
+        - killers: For each ply from the root, the last quiet moves that caused a cutoff there, latest first
+        - history: For each colour, how much each quiet move has caused cutoffs, indexed by the start and end squares
+          of the move, move & SQUARES_MASK
+        - cutoffs: The number of cutoffs made by the search since the engine was created
+        - first_move_cutoffs: The number of those cutoffs that were made by the first move searched
+        - null_move_pruning: Whether the search tries null moves, USE_NULL_MOVE_PRUNING by default
+        - late_move_reductions: Whether the search reduces late quiet moves, USE_LATE_MOVE_REDUCTIONS by default
+        - principal_variation: The moves expected to be played from the root, found by the last search
+        - pv_lines: For each ply from the root, the best line found so far from the position being searched there
+        - following_pv: Whether the position being searched was reached by following the last principal variation
+
+    Inside the search, moves are encoded by encode_move. They are decoded into (start_position, end_position) tuples
+    for the results of a search, such as the move returned and the principal variation.
     """
-    board: Board
-
-    def __init__(self, board: Board,):
+    board: Board | BitBoard
+    table: TranspositionTable
+    nodes: int
+    quiescence_nodes: int
+    generated_moves: int
+    deadline: Optional[float]
+    node_limit: Optional[int]
+    depth_reached: int
+    iterations: list[tuple[tuple[tuple[int, int], tuple[int, int]], float]]
+    root_moves: Optional[list[tuple[tuple[int, int], tuple[int, int]]]]
+    stopped: bool
+    tablebase: Optional[Tablebase]
+    root_ply: int
+    move_lists: list[tuple[array, array]]
+    killers: list[list[int]]
+    history: dict[str, list[int]]
+    cutoffs: int
+    first_move_cutoffs: int
+    null_move_pruning: bool
+    late_move_reductions: bool
+    principal_variation: list[tuple[tuple[int, int], tuple[int, int]]]
+    pv_lines: list[list[int]]
+    following_pv: bool
+
+    def __init__(self, board: Board, table: Optional[TranspositionTable] = None, use_bitboards: bool = False,
+                 tablebase: Optional[Tablebase] = TABLEBASE):
+        """
+        Create an engine for board. If use_bitboards is True, the engine searches on a BitBoard copy of board
+        instead of board itself.
+        """
+        if use_bitboards:
+            board = BitBoard(board)
         self.board = board
+        if table is None:
+            table = TranspositionTable()
+        self.table = table
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.generated_moves = 0
+        self.deadline = None
+        self.node_limit = None
+        self.depth_reached = 0
+        self.iterations = []
+        self.root_moves = None
+        self.stopped = False
+        self.tablebase = tablebase
+        self.root_ply = 0
+        self.move_lists = []
+        self.killers = []
+        self.history = {'W': [0] * 64 * 64, 'B': [0] * 64 * 64}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_pruning = USE_NULL_MOVE_PRUNING
+        self.late_move_reductions = USE_LATE_MOVE_REDUCTIONS
+        self.principal_variation = []
+        self.pv_lines = []
+        self.following_pv = False
+
+    def iterative_deepening(self, colour: str, max_depth: int, time_limit: Optional[float] = None,
+                            node_limit: Optional[int] = None, root_moves: Optional[list] = None,
+                            on_iteration: Optional[Callable] = None):
+        """
+        Choose a move for colour by searching 1, 2, ... up to max_depth moves deep, until the time limit (in seconds)
+        or node limit runs out. Return the move and score of the last depth that was fully searched, and keep its
+        principal variation in self.principal_variation.
+
+        Each search stores its best moves in the transposition table and follows the last principal variation first,
+        so the next, deeper search tries them first. It starts with a narrow aspiration window around the last score,
+        and only searches the full window again if the score falls outside it. If on_iteration is given, it is called
+        after each depth is searched with the depth, the (move, score) found, the nodes searched so far and the
+        principal variation.
+        The first depth is always completed, so a move is returned even if the budget is very small, unless the search
+        is stopped by stop(), in which case None may be returned. If root_moves is given, only those moves are
+        searched from the root. Positions in the endgame tables are played from the tables without searching.
+        """
+        start_time = time.perf_counter()
+        root_ply = len(self.board.moves)
+        searched_nodes = 0
+        quiescence_nodes = 0
+        generated_moves = 0
+        result = None
+        variation = []
+        self.depth_reached = 0
+        self.iterations = []
+        self.principal_variation = []
+
+        if root_moves is None and self.board.piece_count() <= MAX_PIECES:
+            self.nodes = 0
+            self.quiescence_nodes = 0
+            self.generated_moves = 0
+            result = self.tablebase_move(colour)
+            if result is not None:
+                self.principal_variation = [result[0]]
+                if on_iteration is not None:
+                    on_iteration(1, result, 0, self.principal_variation)
+                return result
+        self.root_moves = root_moves
+
+        for depth in range(1, max_depth + 1):
+            windows = [(-CHECKMATE, CHECKMATE)]
+            if result is not None and abs(result[1]) < PROVEN_SCORE:
+                windows.insert(0, (result[1] - ASPIRATION_WINDOW, result[1] + ASPIRATION_WINDOW))
+
+            try:
+                for alpha, beta in windows:
+                    if result is not None:
+                        # Only stop a search part way once there is a move to fall back on
+                        if time_limit is not None:
+                            self.deadline = start_time + time_limit
+                        if node_limit is not None:
+                            self.node_limit = node_limit - searched_nodes
+                    try:
+                        search = self.select_move_try3(depth, colour, None, alpha, beta)
+                    finally:
+                        searched_nodes += self.nodes
+                        quiescence_nodes += self.quiescence_nodes
+                        generated_moves += self.generated_moves
+                        self.deadline = None
+                        self.node_limit = None
+                    if alpha < search[1] < beta:
+                        break
+            except SearchTimeout:
+                # Undo the moves of the unfinished search
+                while len(self.board.moves) > root_ply:
+                    self.board.unmake_move()
+                break
+
+            result = search
+            variation = self.principal_variation
+            self.depth_reached = depth
+            self.iterations.append(result)
+            if on_iteration is not None:
+                on_iteration(depth, result, searched_nodes, variation)
+            plies = plies_to_mate(result[1])
+            if plies is not None and plies <= depth:
+                # A forced checkmate has been found that no deeper search can shorten. A longer win through the
+                # tables could still be beaten by a mate that a deeper search finds.
+                break
+
+        self.nodes = searched_nodes
+        self.quiescence_nodes = quiescence_nodes
+        self.generated_moves = generated_moves
+        self.principal_variation = variation
+        self.root_moves = None
+        return result
 
     def select_move_try3(self, depth: int, colour: str, move, alpha, beta):
         """
-        Choose a move for colour, searching 'depth' moves deep.
+        Choose a move for colour, searching 'depth' moves deep using alpha-beta pruning.
 
+        White is the maximising player and Black the minimising player. Scores outside of the (alpha, beta) window
+        are only bounds. After the first move of a position, each move is searched with a null window first, to show
+        that it is no better than the best so far, and only searched again with the full window if it is better.
+        The principal variation of a search from the root is kept in self.principal_variation.
         """
+        if move is None:
+            # A new search is started from the root
+            self.nodes = 0
+            self.quiescence_nodes = 0
+            self.generated_moves = 0
+            self.root_ply = len(self.board.moves)
+            self.following_pv = True
+            self.table.new_search()
+        self.count_node()
+
+        # The line from this position is filled in once a move has been searched
+        ply = len(self.board.moves) - self.root_ply
+        while len(self.pv_lines) <= ply + 1:
+            self.pv_lines.append([])
+        self.pv_lines[ply] = []
+        follow = self.following_pv
+        self.following_pv = False
+
+        if move is not None and self.tablebase is not None and self.board.piece_count() <= MAX_PIECES:
+            # Endings in the tables are scored perfectly without searching
+            value = self.tablebase.probe_board(self.board, colour)
+            if value is not None:
+                return (move, self.tablebase_score(value, colour, ply))
 
         if depth == 0:
-            return (move, self.evaluate_v1(depth, colour, move))
-
-        legal_moves = self.board.legal_check_moves(colour)
-        if len(legal_moves) == 0:
-            return (move, self.evaluate_v1(depth, colour, move))
+            # Play out the captures before evaluating, so the score isn't taken in the middle of an exchange
+            return (move, self.quiescence(colour, alpha, beta))
+
+        # Use the stored result if this position was already searched deep enough
+        key = self.board.zobrist_key
+        hash_move = 0
+        entry = self.table.probe(key)
+        if entry is not None:
+            entry_depth, entry_score, flag, hash_move = entry
+            entry_score = shift_proven_score(entry_score, -ply)
+            if move is not None and entry_depth >= depth and \
+                    (flag == EXACT or (flag == LOWER_BOUND and entry_score >= beta) or
+                     (flag == UPPER_BOUND and entry_score <= alpha)):
+                return (move, entry_score)
+
+        in_check = depth >= min(NULL_MOVE_MIN_DEPTH, LATE_MOVE_MIN_DEPTH) and self.board.king_in_check(colour)
+        if self.null_move_pruning and move is not None and depth >= NULL_MOVE_MIN_DEPTH and not in_check and \
+                self.board.moves[-1] is not None and self.has_pieces(colour):
+            # If passing the turn still scores beyond the window, a real move almost certainly would as well.
+            # Without pieces, passing could be better than any move (zugzwang), so it isn't tried.
+            opponent = 'B' if colour == 'W' else 'W'
+            self.board.make_null_move()
+            if colour == 'W':
+                window = (beta - NULL_WINDOW, beta)
+            else:
+                window = (alpha, alpha + NULL_WINDOW)
+            _, score = self.select_move_try3(depth - 1 - NULL_MOVE_REDUCTION, opponent, move, *window)
+            self.board.unmake_move()
+            if abs(score) < PROVEN_SCORE and (score >= beta if colour == 'W' else score <= alpha):
+                return (move, score)
+
+        root_moves = None
+        if move is None and self.root_moves is not None:
+            root_moves = {encode_move(start, end) for start, end in self.root_moves}
+
+        # Along the last principal variation, its move is tried first
+        pv_move = 0
+        if follow and ply < len(self.principal_variation):
+            pv_move = hash_move = self.encode(self.principal_variation[ply])
+        # The moves are generated as they are searched, so a cutoff skips generating the rest
+        legal_moves = self.staged_moves(colour, ply, hash_move)
+        lines = {}
+        original_alpha, original_beta = alpha, beta
+        # Quiet moves after the first few are searched less deeply first
+        reduce_late = self.late_move_reductions and move is not None and depth >= LATE_MOVE_MIN_DEPTH and not in_check
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        number = 0
 
         if colour == 'W':
             maximum = - 1000
             best_moves = []
             for move_possible in legal_moves:
-                self.board.make_move(move_possible[0], move_possible[1])
-                x, score = self.select_move_try3(depth - 1, 'B', move_possible, alpha, beta)
+                if root_moves is not None and move_possible & SQUARES_MASK not in root_moves:
+                    continue
+                reduced = reduce_late and number >= LATE_MOVE_INDEX and move_possible not in killers and \
+                    self.is_quiet(move_possible)
+                self.make_encoded_move(move_possible)
+                self.following_pv = follow and move_possible == pv_move
+                if number == 0:
+                    x, score = self.select_move_try3(depth - 1, 'B', move_possible, alpha, beta)
+                else:
+                    if reduced:
+                        x, score = self.select_move_try3(depth - 1 - LATE_MOVE_REDUCTION, 'B', move_possible,
+                                                         alpha, alpha + NULL_WINDOW)
+                    if not reduced or score > alpha:
+                        x, score = self.select_move_try3(depth - 1, 'B', move_possible, alpha, alpha + NULL_WINDOW)
+                    if alpha < score < beta:
+                        x, score = self.select_move_try3(depth - 1, 'B', move_possible, alpha, beta)
                 self.board.unmake_move()
+                number += 1
 
                 if score > maximum:
                     maximum = score
                     best_moves = [x]
+                    self.pv_lines[ply] = [move_possible] + self.pv_lines[ply + 1]
                 elif score == maximum:
                     best_moves.append(x)
-                # alpha = max(alpha, score)
-                # if beta <= alpha:
-                #     break
+                if move is None:
+                    lines[move_possible] = [move_possible] + self.pv_lines[ply + 1]
+
+                if move is None:
+                    # Keep the window open just below the best score at the root, so that equally good moves are
+                    # still given exact scores and can be chosen at random
+                    alpha = max(alpha, maximum - TIE_MARGIN)
+                else:
+                    alpha = max(alpha, score)
+                if beta <= alpha:
+                    self.record_cutoff(colour, move_possible, ply, depth, number == 1)
+                    break
+            if number == 0:
+                # There are no legal moves
+                return (move, self.evaluate_v1(depth, colour, move))
+            if move is not None or self.root_moves is None:
+                # The score of a root searched over only some of its moves is not stored
+                self.store(key, depth, maximum, original_alpha, original_beta, best_moves[0])
             if move is None:
                 # If we have reached the root node, choose one of the best moves
-                return (random.choice(best_moves), maximum)
+                best_move = random.choice(best_moves)
+                self.principal_variation = [decode_move(pv_move) for pv_move in lines[best_move]]
+                return (decode_move(best_move), maximum)
                 # return (best_moves[0], maximum)
             else:
                 # Otherwise return the move made to get to the position so far
@@ -62,93 +426,382 @@ class Engine2:
             minimum = 1000
             best_moves = []
             for move_possible in legal_moves:
-                self.board.make_move(move_possible[0], move_possible[1])
-                x, score = self.select_move_try3(depth - 1, 'W', move_possible, alpha, beta)
+                if root_moves is not None and move_possible & SQUARES_MASK not in root_moves:
+                    continue
+                reduced = reduce_late and number >= LATE_MOVE_INDEX and move_possible not in killers and \
+                    self.is_quiet(move_possible)
+                self.make_encoded_move(move_possible)
+                self.following_pv = follow and move_possible == pv_move
+                if number == 0:
+                    x, score = self.select_move_try3(depth - 1, 'W', move_possible, alpha, beta)
+                else:
+                    if reduced:
+                        x, score = self.select_move_try3(depth - 1 - LATE_MOVE_REDUCTION, 'W', move_possible,
+                                                         beta - NULL_WINDOW, beta)
+                    if not reduced or score < beta:
+                        x, score = self.select_move_try3(depth - 1, 'W', move_possible, beta - NULL_WINDOW, beta)
+                    if alpha < score < beta:
+                        x, score = self.select_move_try3(depth - 1, 'W', move_possible, alpha, beta)
                 self.board.unmake_move()
+                number += 1
 
                 if score < minimum:
                     minimum = score
                     best_moves = [x]
+                    self.pv_lines[ply] = [move_possible] + self.pv_lines[ply + 1]
                 elif score == minimum:
                     best_moves.append(x)
-                # beta = min(beta, score)
-                # if beta <= alpha:
-                #     break
+                if move is None:
+                    lines[move_possible] = [move_possible] + self.pv_lines[ply + 1]
+
+                if move is None:
+                    beta = min(beta, minimum + TIE_MARGIN)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    self.record_cutoff(colour, move_possible, ply, depth, number == 1)
+                    break
+            if number == 0:
+                # There are no legal moves
+                return (move, self.evaluate_v1(depth, colour, move))
+            if move is not None or self.root_moves is None:
+                # The score of a root searched over only some of its moves is not stored
+                self.store(key, depth, minimum, original_alpha, original_beta, best_moves[0])
             if move is None:
                 # If we have reached the root node, choose one of the best moves
-                return (random.choice(best_moves), minimum)
+                best_move = random.choice(best_moves)
+                self.principal_variation = [decode_move(pv_move) for pv_move in lines[best_move]]
+                return (decode_move(best_move), minimum)
             else:
                 # Otherwise return the move made to get to the position so far
                 return (move, minimum)
 
-    def evaluate_v1(self, depth, colour, move: tuple[tuple[int, int], tuple[int, int]]):
+    def tablebase_move(self, colour: str):
         """
-        Evaluate a chess position version 1.
+        Return the best move for colour and its score according to the endgame tables, or None if the position isn't
+        in the tables. Winning moves that mate soonest are best, and losing moves that mate latest.
+        """
+        if self.tablebase is None or self.tablebase.probe_board(self.board, colour) is None:
+            return None
+        opponent = 'B' if colour == 'W' else 'W'
+
+        scores = {}
+        for move in self.board.legal_check_moves(colour):
+            self.make_move(move)
+            value = self.tablebase.probe_board(self.board, opponent)
+            self.board.unmake_move()
+            if value is None:
+                # The move reaches an ending whose table is missing
+                return None
+            scores[move] = self.tablebase_score(value, opponent, 1)
+
+        if not scores:
+            return None
+        best_score = max(scores.values()) if colour == 'W' else min(scores.values())
+        return (random.choice([move for move, score in scores.items() if score == best_score]), best_score)
+
+    def tablebase_score(self, value: int, colour: str, ply: int = 0) -> float:
+        """
+        Return the score of a position ply moves from the root, with colour to move and the given table entry
         """
-        global PIECE_VALUES
+        result, plies = decode_value(value)
+        if result == 0:
+            return 0
+        score = TABLEBASE_WIN - (plies + ply) / 100
+        return score if (result > 0) == (colour == 'W') else -score
 
-        if depth != 0:
-            # Then there are no further legal moves according to select_move_d1()
-            # If black is in check, then it is Checkmate
-            if self.board.king_in_check('B'):
-                return 999
+    def quiescence(self, colour: str, alpha: float, beta: float) -> float:
+        """
+        Return the score of the position after colour and its opponent have played out their captures and promotions.
 
-            if self.board.king_in_check('W'):
-                return -999
-            return 0
+        The side to move can also 'stand pat' and keep the current evaluation instead of making any capture, so the
+        search stops as soon as the evaluation alone is outside of the (alpha, beta) window.
+        """
+        self.count_node()
+        self.quiescence_nodes += 1
+        stand_pat = self.evaluate_v1(0, colour, None)
 
-        white_points = 0
-        black_points = 0
-        for piece in self.board.white_pieces:
+        if colour == 'W':
+            if stand_pat >= beta:
+                return stand_pat
+            maximum = stand_pat
+            alpha = max(alpha, stand_pat)
+            for move in self.order_moves(self.tactical_moves(colour)):
+                self.make_encoded_move(move)
+                score = self.quiescence('B', alpha, beta)
+                self.board.unmake_move()
 
-            if isinstance(piece, King) and piece.has_castled:
-                white_points += 1
+                maximum = max(maximum, score)
+                alpha = max(alpha, score)
+                if beta <= alpha:
+                    break
+            return maximum
 
-            if isinstance(piece, Queen):
-                white_points += 9
+        else:
+            if stand_pat <= alpha:
+                return stand_pat
+            minimum = stand_pat
+            beta = min(beta, stand_pat)
+            for move in self.order_moves(self.tactical_moves(colour)):
+                self.make_encoded_move(move)
+                score = self.quiescence('W', alpha, beta)
+                self.board.unmake_move()
 
-            elif isinstance(piece, Rook):
-                white_points += 5
+                minimum = min(minimum, score)
+                beta = min(beta, score)
+                if beta <= alpha:
+                    break
+            return minimum
 
-            elif isinstance(piece, Bishop):
-                white_points += 3.5
+    def tactical_moves(self, colour: str) -> array:
+        """
+        Return the legal captures and promotions that can be made by colour, encoded by encode_move
+        """
+        return self.generate(colour, len(self.board.moves) - self.root_ply, TACTICAL_MOVES)
 
-            elif isinstance(piece, Knight):
-                white_points += 3
-                if 2 <= piece.position[1] <= 5:
-                    white_points += 0.2
+    def staged_moves(self, colour: str, ply: int, hash_move: int = 0) -> Iterator[int]:
+        """
+        Yield the legal moves of colour, encoded by encode_move, in the order the search tries them: hash_move if it is
+        legal, the captures and promotions that don't lose material, the killer moves at ply, the other quiet moves
+        by their history score, then the captures of a defended piece by a more valuable one.
 
-            elif isinstance(piece, Pawn):
-                white_points += 1
-                if piece.has_moved and 2 <= piece.position[1] <= 5:
-                    white_points += 0.1
+        The captures and the quiet moves are each generated only once they are reached, so if the caller stops
+        iterating after a cutoff, the moves it didn't reach may never be generated. Promotions to pieces other than a
+        Queen are left out, as the engine always promotes to a Queen.
+        """
+        tactical = quiet = None
+        if hash_move:
+            # The hash move is checked against the moves of its own kind, so it can be searched before the other
+            # kind is generated
+            if hash_move & (CAPTURE_FLAG | PROMOTION_FLAG):
+                tactical = self.generate(colour, ply, TACTICAL_MOVES)
+                legal = hash_move in tactical
+            else:
+                quiet = self.generate(colour, ply, QUIET_MOVES)
+                legal = hash_move in quiet
+            if legal:
+                yield hash_move
+
+        if tactical is None:
+            tactical = self.generate(colour, ply, TACTICAL_MOVES)
+        opponent = 'B' if colour == 'W' else 'W'
+        bad_captures = []
+        for move in self.order_moves(tactical):
+            if move == hash_move:
+                continue
+            if self.losing_capture(move, opponent):
+                bad_captures.append(move)
+            else:
+                yield move
 
-        for piece in self.board.black_pieces:
+        if quiet is None:
+            quiet = self.generate(colour, ply, QUIET_MOVES)
+        killers = [killer for killer in self.killers[ply] if killer != hash_move and killer in quiet] \
+            if ply < len(self.killers) else []
+        yield from killers
+        for move in self.order_moves(quiet, ply=ply):
+            if move != hash_move and move not in killers:
+                yield move
 
-            # black_points += 0.02 * piece.position[0]
-            if isinstance(piece, King) and piece.has_castled:
-                black_points += 1
+        yield from bad_captures
 
-            if isinstance(piece, Queen):
-                black_points += 9
+    def generate(self, colour: str, ply: int, kinds: int) -> array:
+        """
+        Return the legal moves of the given kinds that can be made by colour, generated into an array kept for ply
+        """
+        moves = self.move_list(ply, kinds)
+        self.board.generate_moves(colour, moves, kinds)
+        self.generated_moves += len(moves)
+        return moves
+
+    def losing_capture(self, move: int, opponent: str) -> bool:
+        """
+        Return whether the encoded move captures a piece of opponent that is worth less than the capturing piece and
+        defended, so it is likely to lose material
+        """
+        if not move & CAPTURE_FLAG or move & PROMOTION_FLAG:
+            return False
+        end = SQUARE_POSITIONS[move >> END_SHIFT & 63]
+        attacker = self.board.piece_at(SQUARE_POSITIONS[move & 63])
+        victim = self.board.piece_at(end)
+        if victim is None:
+            # An en passant capture, pawn for pawn
+            return False
+        return PIECE_VALUES[attacker[1]] > PIECE_VALUES[victim[1]] and self.board.square_attacked(end, opponent)
+
+    def encode(self, move: tuple[tuple[int, int], tuple[int, int]]) -> int:
+        """
+        Return move encoded by encode_move, with the flags it has in the current position, promoting to a Queen
+        """
+        start, end = move
+        piece = self.board.piece_at(start)
+        pawn = piece is not None and piece[1] == 'P'
+        promotion = 'Q' if pawn and (end[0] == 0 or end[0] == 7) else None
+        # A pawn moving to another file always captures, even onto an empty square en passant
+        capture = self.board.piece_at(end) is not None or (pawn and start[1] != end[1])
+        return encode_move(start, end, promotion, capture)
+
+    def make_move(self, move: tuple[tuple[int, int], tuple[int, int]]):
+        """
+        Make move on the board, promoting a pawn that reaches the last rank to a Queen
+        """
+        start, end = move
+        if self.board.piece_at(start)[1] == 'P' and (end[0] == 0 or end[0] == 7):
+            self.board.make_move(start, end, 'Q')
+        else:
+            self.board.make_move(start, end)
+
+    def make_encoded_move(self, move: int):
+        """
+        Make a move encoded by encode_move on the board
+        """
+        self.board.make_move(*decode_move(move), move_promotion(move))
+
+    def move_list(self, ply: int, kinds: int = TACTICAL_MOVES) -> array:
+        """
+        Return the array that the moves of the given kinds of the position ply moves from the root are generated into
+        """
+        while len(self.move_lists) <= ply:
+            self.move_lists.append((array('H'), array('H')))
+        return self.move_lists[ply][kinds == QUIET_MOVES]
 
-            if isinstance(piece, Rook):
-                black_points += 5
+    def count_node(self):
+        """
+        Count a position visited by the search, and stop the search if its time or node budget has run out or it
+        has been stopped
+        """
+        self.nodes += 1
+        if self.nodes % BUDGET_CHECK_INTERVAL == 0 and \
+                (self.stopped or
+                 (self.deadline is not None and time.perf_counter() > self.deadline) or
+                 (self.node_limit is not None and self.nodes > self.node_limit)):
+            raise SearchTimeout
+
+    def stop(self):
+        """
+        Ask the search in progress to stop as soon as it next checks its budget. This can be called from another thread.
+        """
+        self.stopped = True
 
-            if isinstance(piece, Bishop):
-                black_points += 3.5
+    def store(self, key: int, depth: int, score: float, alpha: float, beta: float, best_move: int):
+        """
+        Store the score of a position searched with the window (alpha, beta) in the transposition table. Proven scores
+        are stored counted from the position rather than from the root, since it can be reached at other plies.
+        """
+        if score <= alpha:
+            flag = UPPER_BOUND
+        elif score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        ply = len(self.board.moves) - self.root_ply
+        self.table.store(key, depth, shift_proven_score(score, ply), flag, best_move)
 
-            if isinstance(piece, Knight):
-                black_points += 3
-                if 2 <= piece.position[1] <= 5:
-                    black_points += 0.2
+    def record_cutoff(self, colour: str, move: int, ply: int, depth: int, first: bool):
+        """
+        Record that move, made by colour ply moves from the root with depth left to search, caused a cutoff.
+        first is whether it was the first move searched.
 
-            if isinstance(piece, Pawn):
-                black_points += 1
-                if piece.has_moved and 2 <= piece.position[1] <= 5:
-                    black_points += 0.1
+        A quiet move becomes the latest killer move at its ply, and its history score grows by depth squared, so
+        cutoffs found by deeper searches count for more.
+        """
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+
+        if not self.is_quiet(move):
+            return
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLER_SLOTS:]
+        self.history[colour][move & SQUARES_MASK] += depth * depth
+
+    def is_quiet(self, move: int) -> bool:
+        """
+        Return whether the encoded move is neither a capture nor a promotion
+        """
+        return not move & (CAPTURE_FLAG | PROMOTION_FLAG)
+
+    def has_pieces(self, colour: str) -> bool:
+        """
+        Return whether colour has any pieces other than its King and pawns
+        """
+        return any(notation[0] == colour and notation[1] not in 'KP' for notation, _ in self.board.piece_list())
+
+    def first_move_cutoff_rate(self) -> float:
+        """
+        Return the fraction of cutoffs made by the first move searched, a measure of how well the moves are ordered
+        """
+        if self.cutoffs == 0:
+            return 0
+        return self.first_move_cutoffs / self.cutoffs
+
+    def order_moves(self, moves, hash_move: int = 0, ply: Optional[int] = None) -> list[int]:
+        """
+        Return the encoded moves sorted so that the ones most likely to cause a cutoff are searched first.
+
+        The best move stored in the transposition table comes first, then captures and promotions ordered by Most
+        Valuable Victim - Least Valuable Attacker (MVV-LVA), followed by the quiet moves. Quiet moves that were
+        killer moves at ply come first, then the rest by their history score. Promotions to pieces other than a Queen
+        are left out, as the engine always promotes to a Queen.
+        """
+        if not moves:
+            return []
+        piece_at = self.board.piece_at
+        killers = self.killers[ply] if ply is not None and ply < len(self.killers) else []
+        history = self.history[piece_at(SQUARE_POSITIONS[moves[0] & 63])[0]]
+
+        def mvv_lva(move: int) -> float:
+            if move == hash_move:
+                return 1000
+            score = 0
+            if move & PROMOTION_FLAG:
+                # A promotion gains as much as capturing a Queen with the pawn
+                score += 10 * PIECE_VALUES['Q'] - PIECE_VALUES['P']
+            if move & CAPTURE_FLAG:
+                # The end square of an en passant capture is empty, and its victim is a pawn
+                victim = piece_at(SQUARE_POSITIONS[move >> END_SHIFT & 63]) or 'P'
+                attacker = piece_at(SQUARE_POSITIONS[move & 63])
+                score += 10 * PIECE_VALUES[victim[-1]] - PIECE_VALUES[attacker[1]]
+            elif score == 0:
+                # Quiet moves score below every capture, which all score at least 1
+                if move in killers:
+                    return 0.9 - 0.1 * killers.index(move)
+                count = history[move & SQUARES_MASK]
+                return 0.5 * count / (count + 1)
+            return score
+
+        return sorted([move for move in moves if not is_underpromotion(move)], key=mvv_lva, reverse=True)
+
+    def ordered_legal_moves(self, colour: str) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+        """
+        Return the legal moves of colour in the order the search would try them
+        """
+        moves = array('H')
+        self.board.generate_moves(colour, moves)
+        return [decode_move(move) for move in self.order_moves(moves)]
+
+    def evaluate_v1(self, depth, colour, move: tuple[tuple[int, int], tuple[int, int]]):
+        """
+        Evaluate a chess position version 1.
+        """
+
+        if depth != 0:
+            # Then there are no further legal moves according to select_move_d1()
+            # If black is in check, then it is Checkmate, and the sooner it is delivered the better
+            ply = len(self.board.moves) - self.root_ply
+            if self.board.king_in_check('B'):
+                return CHECKMATE - ply
+
+            if self.board.king_in_check('W'):
+                return -(CHECKMATE - ply)
+            return 0
 
-        return white_points - black_points
+        # The board keeps the evaluation up to date as moves are made, in tenths of a pawn
+        return (self.board.material + self.board.positional) / 10
 
 
 def difficulty_zero(board: Board, colour: str) -> (tuple[int, int], tuple[int, int]):
@@ -160,12 +813,11 @@ def difficulty_zero(board: Board, colour: str) -> (tuple[int, int], tuple[int, i
     if colour == 'W':
         # Randomly select a piece of the colour if it has at least one legal move
         piece = random.choice(board.white_pieces)
-        while len(piece.legal_check_moves(board.positions)) == 0:
+        while len(board.legal_moves_from(piece.position)) == 0:
             piece = random.choice(board.white_pieces)
     else:
         piece = random.choice(board.black_pieces)
-        while len(piece.legal_check_moves(board.positions)) == 0:
+        while len(board.legal_moves_from(piece.position)) == 0:
             piece = random.choice(board.black_pieces)
 
-    move = random.choice(piece.legal_check_moves(board.positions))
-    return (piece.position, move)
+    return random.choice(board.legal_moves_from(piece.position))
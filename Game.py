@@ -4,8 +4,13 @@ Contains Info about a single game of Chess
 
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import Optional
 from Board import Board, EMPTY_BOARD, Pawn
-from Engine import Engine2, difficulty_zero
+from Engine import difficulty_zero
+from TranspositionTable import TranspositionTable
+from ParallelSearch import ParallelSearch
+from BackgroundSearch import BackgroundSearch
+from OpeningBook import OpeningBook
 
 import pygame_widgets
 from pygame_widgets.button import Button
@@ -18,6 +23,19 @@ global BACKGROUND_IMAGE
 global PIECES
 global RED_SQUARE
 
+# Memory limit of the engine's transposition table, in megabytes
+TRANSPOSITION_TABLE_MB = 16
+# Longest time the engine may think about a move, in seconds
+MOVE_TIME_LIMIT = 3
+# Whether the engine searches on a BitBoard copy of the board instead of the Board itself
+USE_BITBOARDS = False
+# Number of processes the engine searches with. With more than one, the root moves are split between them
+ENGINE_WORKERS = 1
+# Whether the engine keeps thinking while it waits for its opponent to move
+PONDER = True
+# The opening book the engine plays from before it starts searching, built by OpeningBook.py
+OPENING_BOOK_PATH = os.path.join('Assets', 'book.bin')
+
 # Features
 # TODO Optimise Engines
 # TODO En Passant
@@ -34,6 +52,9 @@ class Game:
         - is_over: A boolean value keeping track of whether the game is over (Stalemate or Checkmate)
         - computer_colour: The colour of the engine player, 'W' or 'B' or 'N' if there is no engine
         - moves: A list of the moves made up till this point in the form, (piece_notation, start_posn, end_posn)
+        - table: The transposition table kept by the engine between its moves
+        - search: The engine's searches, run in the background so the window keeps responding while it thinks
+        - book: The opening book that the engine plays from, or None if there isn't one
     """
 
     board: Board
@@ -42,6 +63,9 @@ class Game:
     computer_colour: str
     computer_difficulty: int
     moves: list[tuple[str, tuple[int, int]]]
+    table: TranspositionTable
+    search: Optional[BackgroundSearch]
+    book: Optional[OpeningBook]
 
     def __init__(self, opponent: str, computer_colour: str, computer_difficulty):
         self.board = Board(EMPTY_BOARD)
@@ -49,11 +73,21 @@ class Game:
         if opponent == 'C':
             self.computer_colour = computer_colour
             self.computer_difficulty = computer_difficulty
+            self.table = TranspositionTable(TRANSPOSITION_TABLE_MB)
 
         else:
             self.computer_colour = 'N'
         self.is_over = False
         self.moves = []
+        self.search = None
+        if self.computer_colour != 'N':
+            parallel_search = None
+            if ENGINE_WORKERS > 1:
+                parallel_search = ParallelSearch(ENGINE_WORKERS, USE_BITBOARDS, TRANSPOSITION_TABLE_MB)
+            self.search = BackgroundSearch(self.table, USE_BITBOARDS, parallel_search)
+        self.book = None
+        if self.computer_colour != 'N' and os.path.exists(OPENING_BOOK_PATH):
+            self.book = OpeningBook(OPENING_BOOK_PATH)
 
     def play_game(self):
         """
@@ -95,12 +129,12 @@ class Game:
         self.draw_board(pos, board_posn, rect)
 
         end = False
+        clock = pygame.time.Clock()
         while not self.is_over and not end:
+            clock.tick(FPS)
 
-            clock = pygame.time.Clock()
             # Event handling
             for event in pygame.event.get():
-                clock.tick(FPS)
 
                 if event.type == pygame.QUIT:
                     # If quit, end the game
@@ -116,7 +150,8 @@ class Game:
                     else:
                         board_posn = (7 - pos[1] // 100, pos[0] // 100)
 
-                    if 0 <= board_posn[0] <= 7 and 0 <= board_posn[1] <= 7:
+                    # The engine's pieces can't be picked up while it is thinking about its move
+                    if 0 <= board_posn[0] <= 7 and 0 <= board_posn[1] <= 7 and not self.computer_turn():
                         piece_to_move = self.board.positions[board_posn[0]][board_posn[1]]
                         if piece_to_move and ((self.white_turn and piece_to_move.colour == 'W') or
                                                           (not self.white_turn and piece_to_move.colour == 'B')):
@@ -127,7 +162,7 @@ class Game:
                                 moving = True
 
                             # Draw all the legal moves that can be made
-                            for move in piece_to_move.legal_check_moves(self.board.positions):
+                            for move in self.board.legal_moves_from(board_posn):
                                 move = move[1]
                                 if self.computer_colour == 'W':
                                     draw_posn = (700 - move[1] * 100 + 37, (move[0]) * 100 + 37)
@@ -154,7 +189,7 @@ class Game:
                             end_board_posn = (7 - end_pos[1] // 100, end_pos[0] // 100)
 
                         # If the end position is a legal move, make the move
-                        if (board_posn, end_board_posn) in piece_to_move.legal_check_moves(self.board.positions):
+                        if (board_posn, end_board_posn) in self.board.legal_check_moves(piece_to_move.colour):
                             self.make_move(board_posn, end_board_posn, pos, rect)
 
                         else:
@@ -167,20 +202,35 @@ class Game:
                     rect.move_ip(event.rel)
                     self.draw_board(pos, board_posn, rect)
 
-                # Engine's Turn
-                if not self.is_over and self.computer_turn():
-                    if self.computer_difficulty == 0:
-                        move = difficulty_zero(self.board, self.computer_colour)
-                        self.make_move(move[0][0], move[0][1], pos, rect)
-
+            # Engine's Turn
+            if not self.is_over and not end and self.computer_turn():
+                if self.computer_difficulty == 0:
+                    move = difficulty_zero(self.board, self.computer_colour)
+                    self.make_move(move[0], move[1], pos, rect)
+
+                elif not self.search.is_searching():
+                    # Play from the opening book while the game is still in it
+                    book_move = None
+                    if self.book is not None:
+                        book_move = self.book.choose_move(self.board)
+
+                    if book_move is not None:
+                        # The pondering search would otherwise carry on over the wrong position
+                        self.search.stop_pondering()
+                        self.make_move(book_move[0], book_move[1], pos, rect)
                     else:
-                        engine = Engine2(self.board)
-                        move = engine.select_move_try3(self.computer_difficulty, self.computer_colour, None, -999, 999)
-                        # engine = Engine(None, self.board, self.computer_difficulty, self.computer_colour)
-                        # move = engine.select_move_d1(-999, 999)
+                        # The difficulty limits how deep the engine searches, within its time limit
+                        self.search.start(self.board, self.computer_colour, self.computer_difficulty,
+                                          time_limit=MOVE_TIME_LIMIT)
 
+                else:
+                    # Keep handling events until the engine has found its move
+                    move = self.search.poll()
+                    if move is not None:
                         self.make_move(move[0][0], move[0][1], pos, rect)
-
+                        if PONDER and not self.is_over:
+                            # Think about the reply until it is made, when the next search stops the pondering
+                            self.search.ponder(self.board, self.computer_colour)
 
         # At the end of the game, write down all the moves made
         # for i in range(0, len(self.moves) - 1, 2):
@@ -210,6 +260,12 @@ class Game:
         #     screen.blit(message, message_rect)
         #     pygame.display.flip()
 
+        if self.search is not None:
+            # Stop the engine if the game was quit while it was thinking
+            self.search.shutdown()
+        if self.book is not None:
+            self.book.close()
+
         # Keep board in final state until mouse is pressed
         end_button = Button(SCREEN, 900, 450, 200, 100, text="Continue")
         while not end:
@@ -226,15 +282,16 @@ class Game:
         Move the piece_to_move with position board_posn to end_board_posn
         """
         piece = self.board.positions[board_posn[0]][board_posn[1]]
-        self.board.make_move(board_posn, end_board_posn)
-        self.moves.append((piece.notation[1], end_board_posn))
 
         # Deal with promotions
+        new_piece = None
         if isinstance(piece, Pawn) and ((piece.colour == 'W' and end_board_posn[0] == 7) or
                                         (piece.colour == 'B' and end_board_posn[0] == 0)):
 
             new_piece = self.draw_promotion(piece.colour)
-            self.board.promote_pawn(piece, new_piece)
+
+        self.board.make_move(board_posn, end_board_posn, new_piece)
+        self.moves.append((piece.notation[1], end_board_posn))
 
         # Alternate Turns
         self.white_turn = not self.white_turn
@@ -0,0 +1,82 @@
+"""
+Contains Info about the compact encoding of moves used inside the Chess Engines
+
+A move is encoded in 16 bits, so the moves of a position fit in an array('H') instead of a set of tuples:
+
+    bits 0-5    the start square, numbered rank * 8 + file
+    bits 6-11   the end square
+    bit 12      set if the move is a capture
+    bit 13      set if the move is a promotion
+    bits 14-15  the piece promoted to, as an index into PROMOTION_PIECES
+
+The squares are packed the same way as pack_move in TranspositionTable, so move & SQUARES_MASK of an encoded move is
+its packed move. Moves only need to be decoded into (start_position, end_position) tuples at the edges of the
+program, where they are shown or passed to Board.make_move.
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+SQUARES_MASK = 0xFFF
+END_SHIFT = 6
+CAPTURE_FLAG = 1 << 12
+PROMOTION_FLAG = 1 << 13
+PROMOTION_SHIFT = 14
+
+# Pieces a pawn can be promoted to, in the order of their index in an encoded move
+PROMOTION_PIECES = 'QRBN'
+
+# Kinds of moves that generate_moves can be asked for. A search generates the captures and promotions of a position
+# first, and only generates its quiet moves if none of those causes a cutoff.
+TACTICAL_MOVES = 1
+QUIET_MOVES = 2
+ALL_MOVES = TACTICAL_MOVES | QUIET_MOVES
+
+# The position of each square, shared so that decoding a move doesn't make new position tuples
+SQUARE_POSITIONS = [(square >> 3, square & 7) for square in range(64)]
+
+
+def encode_move(start: tuple[int, int], end: tuple[int, int], promotion: Optional[str] = None,
+                capture: bool = False) -> int:
+    """
+    Return the move from start to end encoded in 16 bits, promoting to promotion if it is given
+
+    >>> encode_move((0, 4), (1, 4))
+    772
+    >>> decode_move(encode_move((6, 0), (7, 1), 'N', True))
+    ((6, 0), (7, 1))
+    """
+    move = (start[0] * 8 + start[1]) | (end[0] * 8 + end[1]) << END_SHIFT
+    if capture:
+        move |= CAPTURE_FLAG
+    if promotion is not None:
+        move |= PROMOTION_FLAG | PROMOTION_PIECES.index(promotion) << PROMOTION_SHIFT
+    return move
+
+
+def decode_move(move: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    """
+    Return the (start_position, end_position) of an encoded move
+    """
+    return (SQUARE_POSITIONS[move & 63], SQUARE_POSITIONS[move >> END_SHIFT & 63])
+
+
+def move_promotion(move: int) -> Optional[str]:
+    """
+    Return the piece an encoded move promotes to, or None if it isn't a promotion
+
+    >>> move_promotion(encode_move((6, 0), (7, 0), 'Q'))
+    'Q'
+    >>> move_promotion(encode_move((0, 4), (1, 4))) is None
+    True
+    """
+    if not move & PROMOTION_FLAG:
+        return None
+    return PROMOTION_PIECES[move >> PROMOTION_SHIFT]
+
+
+def is_underpromotion(move: int) -> bool:
+    """
+    Return whether an encoded move promotes to a piece other than a Queen
+    """
+    return move >> PROMOTION_SHIFT != 0
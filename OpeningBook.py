@@ -0,0 +1,228 @@
+"""
+Contains Info about the Opening Book used by the Chess Engines
+
+The book is built from collections of games in PGN format by running this module:
+
+    python OpeningBook.py Assets/book.bin games1.pgn games2.pgn --plies 16
+"""
+
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass
+import mmap
+import random
+import re
+import struct
+from typing import Iterator, Optional
+from Board import Board, EMPTY_BOARD, coordinate_to_position
+from TranspositionTable import pack_move, unpack_move
+
+# Layout of one entry of the book: the Zobrist key of the position, the move packed by pack_move and its weight
+ENTRY_FORMAT = struct.Struct('<QHH')
+ENTRY_SIZE = ENTRY_FORMAT.size
+MAX_WEIGHT = 0xFFFF
+
+# Number of moves from the start of each game added to the book by default
+DEFAULT_BOOK_PLIES = 16
+
+# Parts of PGN movetext that aren't moves: comments, NAGs, move numbers and results
+PGN_IGNORED = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+|\d+\.(\.\.)?|1-0|0-1|1/2-1/2|\*')
+SAN_MOVE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(=?([NBRQ]))?[+#!?]*$')
+
+
+@dataclass
+class OpeningBook:
+    """
+    A book of opening moves, stored in a file of entries sorted by the Zobrist key of their position.
+
+    The file is memory mapped rather than read, so opening a book takes no time or memory of its own however large it
+    is, and the moves for a position are found by binary search. Because the keys are this program's own Zobrist
+    keys, a book has to be rebuilt if the Zobrist constants in Board change.
+
+    Instance Attributes:
+        - path: The file that the book was opened from
+        - data: The memory mapped contents of the file, or None if the file is empty
+        - size: The number of entries in the book
+
+    Representation Invariants:
+        - self.size == 0 or len(self.data) == self.size * ENTRY_SIZE
+    """
+    path: str
+    data: Optional[mmap.mmap]
+    size: int
+
+    def __init__(self, path: str):
+        """
+        Open the book stored at path
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            file.seek(0, 2)
+            if file.tell() < ENTRY_SIZE:
+                # An empty file can't be mapped
+                self.data = None
+                self.size = 0
+            else:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.size = len(self.data) // ENTRY_SIZE
+
+    def entries(self, key: int) -> list[tuple[tuple[tuple[int, int], tuple[int, int]], int]]:
+        """
+        Return the (move, weight) entries of the position with the given Zobrist key
+        """
+        # Find the first entry with the key
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if ENTRY_FORMAT.unpack_from(self.data, middle * ENTRY_SIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        while low < self.size:
+            entry_key, move, weight = ENTRY_FORMAT.unpack_from(self.data, low * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            entries.append((unpack_move(move), weight))
+            low += 1
+        return entries
+
+    def choose_move(self, board: Board) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+        """
+        Choose one of the book moves for the side to move on board at random, with more weight given to moves played
+        more often. Return None if the position isn't in the book.
+        """
+        # Only legal moves are trusted, in case another position shares the key
+        legal_moves = board.legal_check_moves(board.turn)
+        entries = [(move, weight) for move, weight in self.entries(board.zobrist_key) if move in legal_moves]
+        if not entries:
+            return None
+        return random.choices([move for move, _ in entries], [weight for _, weight in entries])[0]
+
+    def close(self):
+        """
+        Close the memory mapped file
+        """
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+            self.size = 0
+
+
+def build_book(pgn_paths: list[str], book_path: str, plies: int = DEFAULT_BOOK_PLIES, min_weight: int = 1) -> int:
+    """
+    Build an opening book at book_path from the first plies moves of every game in the PGN files at pgn_paths,
+    weighting each move by the number of games it was played in. Moves played in fewer than min_weight games are
+    left out. Return the number of entries written.
+    """
+    counts = {}
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding='utf-8', errors='replace') as file:
+            for game in read_pgn_games(file.read()):
+                board = Board(EMPTY_BOARD)
+                for san in game[:plies]:
+                    move = parse_san(board, san)
+                    if move is None:
+                        # The rest of the game can't be followed, e.g. after a move written ambiguously
+                        break
+                    start, end, promotion = move
+                    entry = (board.zobrist_key, pack_move((start, end)))
+                    counts[entry] = counts.get(entry, 0) + 1
+                    board.make_move(start, end, promotion)
+
+    entries = sorted(entry for entry, count in counts.items() if count >= min_weight)
+    with open(book_path, 'wb') as file:
+        for key, move in entries:
+            file.write(ENTRY_FORMAT.pack(key, move, min(counts[(key, move)], MAX_WEIGHT)))
+    return len(entries)
+
+
+def read_pgn_games(text: str) -> Iterator[list[str]]:
+    """
+    Yield the moves of each game in the PGN text, in Standard Algebraic Notation
+
+    >>> list(read_pgn_games('[Event "?"]\\n\\n1. e4 {Best by test} e5 2. Nf3 (2. f4) Nc6 1-0\\n'))
+    [['e4', 'e5', 'Nf3', 'Nc6']]
+    """
+    moves = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('['):
+            # Tags start a new game
+            if moves:
+                yield split_movetext(' '.join(moves))
+            moves = []
+        elif line:
+            moves.append(line)
+
+        if re.search(r'(1-0|0-1|1/2-1/2|\*)$', line) and moves:
+            yield split_movetext(' '.join(moves))
+            moves = []
+    if moves:
+        yield split_movetext(' '.join(moves))
+
+
+def split_movetext(movetext: str) -> list[str]:
+    """
+    Return the moves of the main line of the PGN movetext
+    """
+    # Remove variations, innermost first
+    while True:
+        stripped = re.sub(r'\([^()]*\)', ' ', movetext)
+        if stripped == movetext:
+            break
+        movetext = stripped
+    return PGN_IGNORED.sub(' ', movetext).split()
+
+
+def parse_san(board: Board, san: str) -> Optional[tuple[tuple[int, int], tuple[int, int], Optional[str]]]:
+    """
+    Return the (start, end, promotion) of the move for the side to move on board written in Standard Algebraic
+    Notation as san, or None if it isn't a legal move
+
+    >>> parse_san(Board(EMPTY_BOARD), 'Nf3')
+    ((0, 6), (2, 5), None)
+    >>> parse_san(Board(EMPTY_BOARD), 'e5') is None
+    True
+    """
+    colour = board.turn
+    legal_moves = board.legal_check_moves(colour)
+    rank = 0 if colour == 'W' else 7
+    san = san.replace('0', 'O').rstrip('+#!?')
+
+    if san in ('O-O', 'O-O-O'):
+        move = ((rank, 4), (rank, 6 if san == 'O-O' else 2))
+        if move in legal_moves and board.piece_at(move[0]) == colour + 'K':
+            return (move[0], move[1], None)
+        return None
+
+    match = SAN_MOVE.match(san)
+    if match is None:
+        return None
+    notation, from_file, from_rank, target, _, promotion = match.groups()
+    end = coordinate_to_position(target)
+    starts = [start for start, move_end in legal_moves
+              if move_end == end and board.piece_at(start)[1] == (notation or 'P') and
+              (from_file is None or start[1] == ord(from_file) - ord('a')) and
+              (from_rank is None or start[0] == int(from_rank) - 1)]
+    if len(starts) != 1:
+        return None
+
+    if notation is None and end[0] == 7 - rank:
+        # A pawn reaching the last rank is promoted to a Queen unless another piece is given
+        return (starts[0], end, promotion or 'Q')
+    return (starts[0], end, None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build an opening book from games in PGN format')
+    parser.add_argument('book', help='the book file to write')
+    parser.add_argument('pgn', nargs='+', help='the PGN files to read the games from')
+    parser.add_argument('--plies', type=int, default=DEFAULT_BOOK_PLIES,
+                        help='the number of moves from the start of each game to add')
+    parser.add_argument('--min-weight', type=int, default=1,
+                        help='the number of games a move must be played in to be added')
+    arguments = parser.parse_args()
+    written = build_book(arguments.pgn, arguments.book, arguments.plies, arguments.min_weight)
+    print(f'Wrote {written} entries to {arguments.book}')
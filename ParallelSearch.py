@@ -0,0 +1,118 @@
+"""
+Contains Info about searching with several processes at once
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import os
+import random
+from typing import Optional
+from Board import Board
+from Engine import Engine2
+from TranspositionTable import TranspositionTable, DEFAULT_MEMORY_MB
+
+# The transposition table of a worker process, kept between the searches it is given
+_worker_table = None
+
+
+@dataclass
+class ParallelSearch:
+    """
+    Searches the root moves of a position in parallel, by splitting them between a pool of worker processes.
+
+    Each worker runs its own iterative deepening over its share of the root moves with the same time budget, so the
+    number of nodes searched in that time grows with the number of workers. Positions are sent to the workers as
+    Board snapshots rather than pickled pieces.
+
+    Instance Attributes:
+        - workers: The number of worker processes
+        - use_bitboards: Whether the workers search on BitBoards
+        - table_mb: The memory limit of each worker's transposition table, in megabytes
+        - executor: The pool of worker processes, or None until the first search
+        - nodes: The number of positions visited by all of the workers in the last search
+        - depth_reached: The depth fully searched by every worker in the last search
+    """
+    workers: int
+    use_bitboards: bool
+    table_mb: float
+    executor: Optional[ProcessPoolExecutor]
+    nodes: int
+    depth_reached: int
+
+    def __init__(self, workers: Optional[int] = None, use_bitboards: bool = False,
+                 table_mb: float = DEFAULT_MEMORY_MB):
+        """
+        Create a parallel search using the given number of worker processes, or one for each CPU if workers is None
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.use_bitboards = use_bitboards
+        self.table_mb = table_mb
+        self.executor = None
+        self.nodes = 0
+        self.depth_reached = 0
+
+    def select_move(self, board: Board, colour: str, max_depth: int, time_limit: Optional[float] = None,
+                    node_limit: Optional[int] = None):
+        """
+        Choose a move for colour on board, searching up to max_depth moves deep within the time limit (in seconds)
+        or node limit shared by the workers. Return the move and its score, like Engine2.iterative_deepening.
+        """
+        # Deal out the root moves in order, so each worker gets a share of the most promising ones
+        engine = Engine2(board, TranspositionTable(0))
+        root_moves = engine.ordered_legal_moves(colour)
+        if not root_moves:
+            # Checkmate or stalemate, which the search scores without any moves to share out
+            result = engine.iterative_deepening(colour, 1)
+            self.nodes = engine.nodes
+            self.depth_reached = engine.depth_reached
+            return result
+        shares = [root_moves[i::self.workers] for i in range(self.workers)]
+        shares = [share for share in shares if share]
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        if node_limit is not None:
+            node_limit = max(1, node_limit // len(shares))
+
+        snapshot = board.snapshot()
+        futures = [self.executor.submit(search_root_moves, snapshot, colour, share, max_depth, time_limit,
+                                        node_limit, self.use_bitboards, self.table_mb) for share in shares]
+        results = [future.result() for future in futures]
+
+        # Only compare scores from a depth that every worker has finished
+        self.nodes = sum(nodes for nodes, _ in results)
+        self.depth_reached = min(len(iterations) for _, iterations in results)
+        scores = [iterations[self.depth_reached - 1] for _, iterations in results]
+
+        if colour == 'W':
+            best_score = max(score for _, score in scores)
+        else:
+            best_score = min(score for _, score in scores)
+        return (random.choice([move for move, score in scores if score == best_score]), best_score)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the worker processes, waiting for the searches they have started to finish if wait is True
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
+
+
+def search_root_moves(snapshot: tuple[str, str, int, str, Optional[tuple[int, int]]], colour: str, root_moves: list,
+                      max_depth: int, time_limit: Optional[float], node_limit: Optional[int], use_bitboards: bool,
+                      table_mb: float) -> tuple[int, list]:
+    """
+    Search only root_moves from the position in snapshot, in a worker process. Return the number of nodes searched
+    and the (move, score) found at each depth that was finished.
+    """
+    global _worker_table
+
+    if _worker_table is None:
+        _worker_table = TranspositionTable(table_mb)
+    engine = Engine2(Board.from_snapshot(snapshot), _worker_table, use_bitboards)
+    engine.iterative_deepening(colour, max_depth, time_limit, node_limit, root_moves)
+    return (engine.nodes, engine.iterations)
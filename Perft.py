@@ -0,0 +1,143 @@
+"""
+Contains Info about Perft, which counts the positions reached by every sequence of legal moves to a given depth
+
+The counts are compared with known results to check the move generation, and the time taken measures its speed.
+Run this module to check the standard positions, or to count the moves of one position:
+
+    python Perft.py
+    python Perft.py --fen "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1" --depth 2 --divide
+"""
+
+from __future__ import annotations
+import argparse
+from array import array
+import sys
+import time
+from typing import Optional
+from Board import Board, STARTING_FEN, position_to_coordinate
+from BitBoard import BitBoard
+from Moves import decode_move, move_promotion
+
+# Standard positions with their known counts at each depth from 1
+PERFT_SUITE = [
+    ('Starting position', STARTING_FEN, [20, 400, 8902, 197281]),
+    ('Kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039, 97862]),
+    ('Position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624]),
+    ('Position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467, 422333]),
+    ('Position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379]),
+    ('Position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10', [46, 2079, 89890]),
+]
+
+
+def perft(board: Board | BitBoard, colour: str, depth: int, cache: Optional[dict[tuple[int, int], int]] = None) \
+        -> int:
+    """
+    Return the number of positions reached by every sequence of depth legal moves starting with colour. If cache is
+    given, the counts of positions already counted are looked up in it by their Zobrist key and depth, so positions
+    reached by different orders of moves are only searched once. The total is the same either way.
+
+    >>> perft(Board.from_fen(STARTING_FEN), 'W', 2)
+    400
+    """
+    if depth == 0:
+        return 1
+    if cache is not None and (board.zobrist_key, depth) in cache:
+        return cache[(board.zobrist_key, depth)]
+
+    moves = array('H')
+    board.generate_moves(colour, moves)
+    if depth == 1:
+        # The positions after the last move don't need to be made to be counted
+        nodes = len(moves)
+    else:
+        opponent = 'B' if colour == 'W' else 'W'
+        nodes = 0
+        for move in moves:
+            board.make_move(*decode_move(move), move_promotion(move))
+            nodes += perft(board, opponent, depth - 1, cache)
+            board.unmake_move()
+
+    if cache is not None:
+        cache[(board.zobrist_key, depth)] = nodes
+    return nodes
+
+
+def divide(board: Board | BitBoard, colour: str, depth: int, cache: Optional[dict[tuple[int, int], int]] = None) \
+        -> dict[str, int]:
+    """
+    Return the perft count after each legal move of colour, keyed by the move in the long algebraic notation of UCI,
+    e.g. 'e2e4' or 'a7a8q'. Comparing these with another program's shows which move has a wrong count.
+
+    >>> divide(Board.from_fen(STARTING_FEN), 'W', 2)['g1f3']
+    20
+    """
+    moves = array('H')
+    board.generate_moves(colour, moves)
+    opponent = 'B' if colour == 'W' else 'W'
+    counts = {}
+    for move in moves:
+        start, end = decode_move(move)
+        promotion = move_promotion(move)
+        board.make_move(start, end, promotion)
+        counts[position_to_coordinate(start) + position_to_coordinate(end) + (promotion or '').lower()] = \
+            perft(board, opponent, depth - 1, cache)
+        board.unmake_move()
+    return counts
+
+
+def run_suite(max_depth: Optional[int] = None, use_bitboards: bool = False, use_cache: bool = False) -> bool:
+    """
+    Count every position of PERFT_SUITE to each of its known depths, up to max_depth, printing each count with the
+    nodes searched per second. Return whether every count was right.
+    """
+    passed = True
+    total_nodes, total_time = 0, 0
+    for name, fen, counts in PERFT_SUITE:
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            board = Board.from_fen(fen)
+            colour = board.turn
+            if use_bitboards:
+                board = BitBoard(board)
+            start_time = time.perf_counter()
+            nodes = perft(board, colour, depth, {} if use_cache else None)
+            elapsed = time.perf_counter() - start_time
+            total_nodes, total_time = total_nodes + nodes, total_time + elapsed
+
+            result = 'ok' if nodes == expected else f'FAILED, expected {expected}'
+            passed = passed and nodes == expected
+            print(f'{name}, depth {depth}: {nodes} nodes in {elapsed:.2f}s '
+                  f'({int(nodes / max(elapsed, 1e-6))} nodes/s) {result}')
+
+    print(f'Total: {total_nodes} nodes in {total_time:.2f}s ({int(total_nodes / max(total_time, 1e-6))} nodes/s)')
+    return passed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Count the positions reached by the legal moves to a given depth')
+    parser.add_argument('--fen', help='the position to count from, instead of checking the standard positions')
+    parser.add_argument('--depth', type=int, help='the depth to count to, or the deepest depth to check')
+    parser.add_argument('--divide', action='store_true', help='print the count after each move')
+    parser.add_argument('--hash', action='store_true',
+                        help='reuse the counts of positions reached by different orders of moves')
+    parser.add_argument('--bitboards', action='store_true', help='generate the moves with BitBoard instead of Board')
+    arguments = parser.parse_args()
+
+    if arguments.fen is None:
+        sys.exit(0 if run_suite(arguments.depth, arguments.bitboards, arguments.hash) else 1)
+
+    position = Board.from_fen(arguments.fen)
+    side = position.turn
+    if arguments.bitboards:
+        position = BitBoard(position)
+    perft_cache = {} if arguments.hash else None
+    perft_depth = arguments.depth or 1
+    started = time.perf_counter()
+    if arguments.divide:
+        move_counts = divide(position, side, perft_depth, perft_cache)
+        for move_name, count in sorted(move_counts.items()):
+            print(f'{move_name}: {count}')
+        total = sum(move_counts.values())
+    else:
+        total = perft(position, side, perft_depth, perft_cache)
+    taken = time.perf_counter() - started
+    print(f'Nodes: {total} in {taken:.2f}s ({int(total / max(taken, 1e-6))} nodes/s)')
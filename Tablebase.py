@@ -0,0 +1,558 @@
+"""
+Contains Info about the Endgame Tablebases used by the Chess Engines
+
+The tables are generated offline by retrograde analysis, by running this module with the endings to build:
+
+    python Tablebase.py KQK KRK KPK KQKR
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+import os
+import sys
+import time
+from typing import Optional
+from Board import Board, EVALUATION_VALUES, KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS
+from BitBoard import BitBoard
+
+# Directory that the tables are stored in
+TABLEBASE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Tablebases')
+
+# Most pieces, including the kings, in an ending covered by the tables
+MAX_PIECES = 4
+
+# Order of the pieces of each side in the name of an ending and in the index of a table
+PIECE_ORDER = 'KQRBNP'
+
+# Endings that are always drawn, so have no table
+DRAWN_ENDINGS = {'KK', 'KBK', 'KNK'}
+
+# Endings built when the module is run without naming any
+DEFAULT_ENDINGS = ['KQK', 'KRK', 'KPK']
+
+# Longest win or loss, in plies, that fits in an entry
+MAX_PLIES = 126
+
+# Squares the White King is moved into by symmetry: a1-d1-d4 without pawns, the a to d files with pawns
+KING_TRIANGLE = [rank * 8 + file for rank in range(4) for file in range(4) if rank <= file]
+KING_HALF = [rank * 8 + file for rank in range(8) for file in range(4)]
+
+
+def _transform(flip_rank: bool, flip_file: bool, transpose: bool) -> list[int]:
+    """
+    Return the square that each square is moved to by flipping the board's ranks, files and diagonal
+    """
+    squares = []
+    for square in range(64):
+        rank, file = square >> 3, square & 7
+        if transpose:
+            rank, file = file, rank
+        if flip_rank:
+            rank = 7 - rank
+        if flip_file:
+            file = 7 - file
+        squares.append(rank * 8 + file)
+    return squares
+
+
+# The symmetries of a board without pawns, and of a board with pawns, starting with the identity
+PAWNLESS_TRANSFORMS = [_transform(flip_rank, flip_file, transpose) for transpose in (False, True)
+                       for flip_rank in (False, True) for flip_file in (False, True)]
+PAWN_TRANSFORMS = [_transform(False, False, False), _transform(False, True, False)]
+
+
+def _step_targets(offsets: tuple[tuple[int, int], ...]) -> list[tuple[int, ...]]:
+    """
+    Return the squares reached from each square by one of the offsets
+    """
+    return [tuple((square >> 3) * 8 + (square & 7) + rank * 8 + file for rank, file in offsets
+                  if 0 <= (square >> 3) + rank <= 7 and 0 <= (square & 7) + file <= 7) for square in range(64)]
+
+
+def _rays(directions: tuple[tuple[int, int], ...]) -> list[tuple[tuple[int, ...], ...]]:
+    """
+    Return the squares along each direction from each square, nearest first
+    """
+    rays = []
+    for square in range(64):
+        square_rays = []
+        for rank_step, file_step in directions:
+            rank, file, ray = (square >> 3) + rank_step, (square & 7) + file_step, []
+            while 0 <= rank <= 7 and 0 <= file <= 7:
+                ray.append(rank * 8 + file)
+                rank, file = rank + rank_step, file + file_step
+            square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return rays
+
+
+KING_TARGETS = _step_targets(KING_OFFSETS)
+KNIGHT_TARGETS = _step_targets(KNIGHT_OFFSETS)
+PAWN_CAPTURES = {'W': _step_targets(((1, -1), (1, 1))), 'B': _step_targets(((-1, -1), (-1, 1)))}
+SLIDING_RAYS = {'R': _rays(ROOK_DIRECTIONS), 'B': _rays(BISHOP_DIRECTIONS),
+                'Q': _rays(ROOK_DIRECTIONS + BISHOP_DIRECTIONS)}
+
+# For each pair of squares on a line, the kind of slider moving along it ('R' or 'B') and the squares in between
+LINES = [[None] * 64 for _ in range(64)]
+for _kind in 'RB':
+    for _square in range(64):
+        for _ray in SLIDING_RAYS[_kind][_square]:
+            for _distance, _target in enumerate(_ray):
+                LINES[_square][_target] = (_kind, _ray[:_distance])
+
+
+def material_name(pieces: list[tuple[str, int]]) -> str:
+    """
+    Return the name of the ending with the given (notation, square) pieces, White's pieces first
+
+    >>> material_name([('BK', 60), ('WR', 0), ('WK', 4)])
+    'KRK'
+    """
+    white = sorted((notation[1] for notation, _ in pieces if notation[0] == 'W'), key=PIECE_ORDER.index)
+    black = sorted((notation[1] for notation, _ in pieces if notation[0] == 'B'), key=PIECE_ORDER.index)
+    return ''.join(white) + ''.join(black)
+
+
+def is_stronger(white: str, black: str) -> bool:
+    """
+    Return whether the pieces in white are at least as strong as those in black, comparing the strongest pieces first
+    """
+    return sorted((EVALUATION_VALUES[piece] for piece in white), reverse=True) >= \
+        sorted((EVALUATION_VALUES[piece] for piece in black), reverse=True)
+
+
+def decode_value(value: int) -> tuple[int, int]:
+    """
+    Return the (result, plies) of a table entry, where result is 1 if the side to move wins, -1 if it loses and 0 for
+    a draw, and plies is the number of moves until checkmate
+
+    >>> decode_value(3)
+    (1, 3)
+    >>> decode_value(-1)
+    (-1, 0)
+    """
+    if value > 0:
+        return (1, value)
+    elif value < 0:
+        return (-1, -value - 1)
+    return (0, 0)
+
+
+def encode_value(result: int, plies: int) -> int:
+    """
+    Return the table entry of a position won (result 1) or lost (result -1) in plies moves
+    """
+    if plies > MAX_PLIES:
+        raise ValueError(f'A mate in {plies} plies is too long to store')
+    return plies if result > 0 else -plies - 1
+
+
+@dataclass
+class Ending:
+    """
+    The layout of the table of one ending.
+
+    Positions are indexed by the side to move, the square of the White King after it is moved by symmetry into
+    region, and then the squares of the other pieces. The pieces are kept in the order of the ending's name.
+
+    Instance Attributes:
+        - name: The name of the ending, e.g. 'KRK'
+        - colours: The colour of each piece
+        - kinds: The kind of each piece, e.g. 'R'
+        - region: The squares that the White King is moved into
+        - region_index: The index of each square in region, or -1 for squares outside it
+        - king_transforms: For each square of the White King, the symmetries that move it into region
+        - size: The number of entries in the table
+    """
+    name: str
+    colours: list[str]
+    kinds: list[str]
+    region: list[int]
+    region_index: list[int]
+    king_transforms: list[list[list[int]]]
+    size: int
+
+    def __init__(self, name: str):
+        self.name = name
+        black_king = name.index('K', 1)
+        self.colours = ['W'] * black_king + ['B'] * (len(name) - black_king)
+        self.kinds = list(name)
+        if 'P' in name:
+            self.region, transforms = KING_HALF, PAWN_TRANSFORMS
+        else:
+            self.region, transforms = KING_TRIANGLE, PAWNLESS_TRANSFORMS
+        self.region_index = [self.region.index(square) if square in self.region else -1 for square in range(64)]
+        self.king_transforms = [[transform for transform in transforms if transform[square] in self.region]
+                                for square in range(64)]
+        self.size = 2 * len(self.region) << 6 * (len(name) - 1)
+
+    def index(self, squares: list[int], side: int) -> int:
+        """
+        Return the index of the position with the pieces on squares and side (0 for White, 1 for Black) to move
+        """
+        transforms = self.king_transforms[squares[0]]
+        if len(transforms) == 1:
+            squares = [transforms[0][square] for square in squares]
+        else:
+            # Several symmetries move the King into the region, so use the one giving the smallest squares
+            squares = min([transform[square] for square in squares] for transform in transforms)
+
+        index = side * len(self.region) + self.region_index[squares[0]]
+        for square in squares[1:]:
+            index = index << 6 | square
+        return index
+
+    def position(self, index: int) -> tuple[list[int], int]:
+        """
+        Return the squares of the pieces and the side to move of the position at index
+        """
+        squares = [0] * len(self.kinds)
+        for piece in range(len(self.kinds) - 1, 0, -1):
+            squares[piece] = index & 63
+            index >>= 6
+        squares[0] = self.region[index % len(self.region)]
+        return (squares, index // len(self.region))
+
+
+@dataclass
+class Tablebase:
+    """
+    The endgame tables stored in a directory, each loaded the first time it is probed.
+
+    Each table holds one signed byte for each position of its ending: a positive number of plies to mate if the side
+    to move wins, one less than minus the number of plies until it is mated if it loses, and 0 for a draw. Endings
+    are stored with the stronger side as White, so positions of the other colour are mirrored first.
+
+    Instance Attributes:
+        - directory: The directory that the tables are stored in
+        - tables: The tables loaded so far, or None for tables that aren't in the directory
+        - endings: The layout of each table loaded so far
+    """
+    directory: str
+    tables: dict[str, Optional[array]]
+    endings: dict[str, Ending]
+
+    def __init__(self, directory: str = TABLEBASE_DIRECTORY):
+        self.directory = directory
+        self.tables = {}
+        self.endings = {}
+
+    def path(self, name: str) -> str:
+        """
+        Return the file that the table of the named ending is stored in
+        """
+        return os.path.join(self.directory, name + '.tb')
+
+    def table(self, name: str) -> Optional[array]:
+        """
+        Return the table of the named ending, loading it if it hasn't been loaded yet, or None if there isn't one
+        """
+        if name not in self.tables:
+            table = None
+            if os.path.exists(self.path(name)):
+                table = array('b')
+                with open(self.path(name), 'rb') as file:
+                    table.frombytes(file.read())
+                self.endings[name] = Ending(name)
+            self.tables[name] = table
+        return self.tables[name]
+
+    def probe(self, pieces: list[tuple[str, int]], colour: str) -> Optional[int]:
+        """
+        Return the table entry of the position with the given (notation, square) pieces and colour to move, or None
+        if its ending has no table
+        """
+        if len(pieces) > MAX_PIECES:
+            return None
+        name = material_name(pieces)
+        if name in DRAWN_ENDINGS:
+            return 0
+
+        black_king = name.index('K', 1)
+        if not is_stronger(name[:black_king], name[black_king:]):
+            # Swap the colours, so that the stronger side is White
+            pieces = [(('B' if notation[0] == 'W' else 'W') + notation[1], square ^ 56)
+                      for notation, square in pieces]
+            colour = 'B' if colour == 'W' else 'W'
+            name = material_name(pieces)
+
+        table = self.table(name)
+        if table is None:
+            return None
+        pieces = sorted(pieces, key=lambda piece: (piece[0][0] == 'B', PIECE_ORDER.index(piece[0][1])))
+        return table[self.endings[name].index([square for _, square in pieces], colour == 'B')]
+
+    def probe_board(self, board: Board | BitBoard, colour: str) -> Optional[int]:
+        """
+        Return the table entry of the position on board with colour to move, or None if it isn't in the tables
+        """
+        if board.castling:
+            return None
+        return self.probe([(notation, rank * 8 + file) for notation, (rank, file) in board.piece_list()], colour)
+
+
+def generate(name: str, tablebase: Tablebase) -> array:
+    """
+    Generate the table of the named ending by retrograde analysis, and save it in tablebase's directory.
+
+    Every position is searched once to count its moves and to score the moves that leave the ending by a capture or
+    promotion, using the tables of the smaller endings. Then, starting from the checkmates, the positions one more
+    ply from mate are found by unmaking moves, until no more positions are decided. The rest are drawn.
+    """
+    ending = Ending(name)
+    kinds, colours = ending.kinds, ending.colours
+    values = array('b', [0]) * ending.size
+    decided = bytearray(ending.size)
+    # The number of different positions in the ending that each position can move to, and are not yet lost for it
+    counts = array('B', [0]) * ending.size
+    # Whether a move leaving the ending draws (1) or wins (2), and the longest loss of the moves leaving the ending
+    escapes = bytearray(ending.size)
+    longest_losses = array('B', [0]) * ending.size
+    # The positions to decide with each number of plies to mate
+    pending = [array('l') for _ in range(MAX_PLIES + 2)]
+
+    for index in range(ending.size):
+        squares, side = ending.position(index)
+        if not legal_position(squares, kinds, colours, side) or ending.index(squares, side) != index:
+            continue
+
+        successors = set()
+        moved = False
+        for new_squares, leaves in moves(squares, kinds, colours, side):
+            moved = True
+            if not leaves:
+                successors.add(ending.index(new_squares, 1 - side))
+                continue
+
+            value = tablebase.probe([(colours[piece] + kind, square) for piece, (kind, square)
+                                     in enumerate(zip(leaves, new_squares)) if square >= 0],
+                                    'B' if side == 0 else 'W')
+            result, plies = decode_value(value)
+            if result < 0:
+                escapes[index] |= 2
+                pending[plies + 1].append(index)
+            elif result == 0:
+                escapes[index] |= 1
+            else:
+                longest_losses[index] = max(longest_losses[index], plies)
+
+        counts[index] = len(successors)
+        if not successors and not escapes[index]:
+            if not moved and in_check(squares, kinds, colours, side):
+                # Checkmate
+                pending[0].append(index)
+            elif moved:
+                # Every move leaves the ending and loses
+                pending[longest_losses[index] + 1].append(index)
+
+    for plies in range(MAX_PLIES + 1):
+        for index in pending[plies]:
+            if decided[index]:
+                continue
+            decided[index] = 1
+            values[index] = encode_value(1 if plies % 2 else -1, plies)
+
+            squares, side = ending.position(index)
+            for previous in {ending.index(previous_squares, 1 - side)
+                             for previous_squares in unmoves(squares, kinds, colours, side)}:
+                if decided[previous]:
+                    continue
+                if plies % 2 == 0:
+                    # The previous position can move to a lost position
+                    pending[plies + 1].append(previous)
+                else:
+                    counts[previous] -= 1
+                    if counts[previous] == 0 and not escapes[previous]:
+                        # Every move from the previous position loses
+                        pending[max(plies, longest_losses[previous]) + 1].append(previous)
+        pending[plies] = array('l')
+
+    if pending[MAX_PLIES + 1]:
+        raise ValueError(f'A mate in {name} is too long to store')
+
+    os.makedirs(tablebase.directory, exist_ok=True)
+    with open(tablebase.path(name), 'wb') as file:
+        file.write(values.tobytes())
+    tablebase.tables[name] = values
+    tablebase.endings[name] = ending
+    return values
+
+
+def sub_endings(name: str) -> set[str]:
+    """
+    Return the endings that can be reached from the named ending by a capture or a promotion
+
+    >>> sorted(sub_endings('KPK'))
+    ['KBK', 'KK', 'KNK', 'KQK', 'KRK']
+    """
+    black_king = name.index('K', 1)
+    white, black = name[:black_king], name[black_king:]
+    endings = set()
+    for pieces, other, is_white in ((white, black, True), (black, white, False)):
+        for position, piece in enumerate(pieces):
+            if piece == 'K':
+                continue
+            changes = [''] + (['Q', 'R', 'B', 'N'] if piece == 'P' else [])
+            for change in changes:
+                changed = ''.join(sorted(pieces[:position] + change + pieces[position + 1:], key=PIECE_ORDER.index))
+                new_white, new_black = (changed, other) if is_white else (other, changed)
+                if not is_stronger(new_white, new_black):
+                    new_white, new_black = new_black, new_white
+                endings.add(new_white + new_black)
+    return endings
+
+
+def build(name: str, tablebase: Tablebase):
+    """
+    Generate the table of the named ending and of every ending reached from it that isn't in tablebase's directory
+    """
+    for sub_ending in sub_endings(name):
+        if sub_ending not in DRAWN_ENDINGS and tablebase.table(sub_ending) is None:
+            build(sub_ending, tablebase)
+    start_time = time.perf_counter()
+    generate(name, tablebase)
+    print(f'Generated {name} in {time.perf_counter() - start_time:.1f}s')
+
+
+def attacked(target: int, colour: str, squares: list[int], kinds: list[str], colours: list[str]) -> bool:
+    """
+    Return whether target is attacked by a piece of colour. Captured pieces have the square -1.
+    """
+    for piece, square in enumerate(squares):
+        if colours[piece] != colour or square < 0:
+            continue
+        kind = kinds[piece]
+        if kind == 'K':
+            if target in KING_TARGETS[square]:
+                return True
+        elif kind == 'N':
+            if target in KNIGHT_TARGETS[square]:
+                return True
+        elif kind == 'P':
+            if target in PAWN_CAPTURES[colour][square]:
+                return True
+        else:
+            line = LINES[square][target]
+            if line is not None and (kind == 'Q' or kind == line[0]) and \
+                    not any(between in squares for between in line[1]):
+                return True
+    return False
+
+
+def in_check(squares: list[int], kinds: list[str], colours: list[str], side: int) -> bool:
+    """
+    Return whether the King of the side (0 for White, 1 for Black) is in check
+    """
+    colour = 'WB'[side]
+    king = squares[colours.index(colour)]
+    return attacked(king, 'BW'[side], squares, kinds, colours)
+
+
+def legal_position(squares: list[int], kinds: list[str], colours: list[str], side: int) -> bool:
+    """
+    Return whether the pieces can be on squares with side to move
+    """
+    if len(set(squares)) != len(squares):
+        return False
+    if any(kinds[piece] == 'P' and not 8 <= square < 56 for piece, square in enumerate(squares)):
+        return False
+    # The side that just moved can't be in check
+    return not in_check(squares, kinds, colours, 1 - side)
+
+
+def moves(squares: list[int], kinds: list[str], colours: list[str], side: int):
+    """
+    Yield the (squares, leaves) after each legal move of side. leaves is None for moves that stay in the ending, or
+    otherwise the kinds of the pieces after a capture or promotion, with the captured piece on square -1.
+    """
+    colour = 'WB'[side]
+    occupants = {square: piece for piece, square in enumerate(squares)}
+    for piece, square in enumerate(squares):
+        if colours[piece] != colour:
+            continue
+        kind = kinds[piece]
+        if kind == 'P':
+            forward = 8 if colour == 'W' else -8
+            targets = []
+            if square + forward not in occupants:
+                targets.append(square + forward)
+                if (square >> 3) == (1 if colour == 'W' else 6) and square + 2 * forward not in occupants:
+                    targets.append(square + 2 * forward)
+            targets += [target for target in PAWN_CAPTURES[colour][square]
+                        if target in occupants and colours[occupants[target]] != colour]
+        elif kind in SLIDING_RAYS:
+            targets = []
+            for ray in SLIDING_RAYS[kind][square]:
+                for target in ray:
+                    targets.append(target)
+                    if target in occupants:
+                        break
+        else:
+            targets = (KING_TARGETS if kind == 'K' else KNIGHT_TARGETS)[square]
+
+        for target in targets:
+            captured = occupants.get(target)
+            if captured is not None and colours[captured] == colour:
+                continue
+            new_squares = list(squares)
+            new_squares[piece] = target
+            if captured is not None:
+                new_squares[captured] = -1
+            if in_check(new_squares, kinds, colours, side):
+                continue
+
+            if kind == 'P' and not 8 <= target < 56:
+                for promotion in 'QRBN':
+                    leaves = list(kinds)
+                    leaves[piece] = promotion
+                    yield (new_squares, leaves)
+            elif captured is not None:
+                yield (new_squares, kinds)
+            else:
+                yield (new_squares, None)
+
+
+def unmoves(squares: list[int], kinds: list[str], colours: list[str], side: int):
+    """
+    Yield the squares of each legal position in the ending that can move to this one, without a capture or promotion,
+    where side is to move now
+    """
+    colour = 'BW'[side]
+    for piece, square in enumerate(squares):
+        if colours[piece] != colour:
+            continue
+        kind = kinds[piece]
+        if kind == 'P':
+            backward = -8 if colour == 'W' else 8
+            origins = []
+            if 8 <= square + backward < 56 and square + backward not in squares:
+                origins.append(square + backward)
+                if (square >> 3) == (3 if colour == 'W' else 4) and square + 2 * backward not in squares:
+                    origins.append(square + 2 * backward)
+        elif kind in SLIDING_RAYS:
+            origins = []
+            for ray in SLIDING_RAYS[kind][square]:
+                for origin in ray:
+                    if origin in squares:
+                        break
+                    origins.append(origin)
+        else:
+            origins = [origin for origin in (KING_TARGETS if kind == 'K' else KNIGHT_TARGETS)[square]
+                       if origin not in squares]
+
+        for origin in origins:
+            previous = list(squares)
+            previous[piece] = origin
+            # The side to move now can't have been left in check
+            if not in_check(previous, kinds, colours, side):
+                yield previous
+
+
+# The tables in TABLEBASE_DIRECTORY, shared by every engine
+TABLEBASE = Tablebase()
+
+
+if __name__ == '__main__':
+    for ending_name in sys.argv[1:] or DEFAULT_ENDINGS:
+        build(ending_name, Tablebase())
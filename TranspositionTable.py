@@ -0,0 +1,128 @@
+"""
+Contains Info about the Transposition Table used by the Chess Engines
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+# Types of scores stored in the table
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Bytes used by one entry: key, score, depth, flag, generation and best move
+ENTRY_SIZE = 8 + 8 + 1 + 1 + 1 + 2
+DEFAULT_MEMORY_MB = 16
+
+
+@dataclass
+class TranspositionTable:
+    """
+    A fixed size table of search results, indexed by the Zobrist key of the position.
+
+    Each entry is spread over parallel arrays so the memory used is fixed when the table is created. When two
+    positions share a slot, the result of the deeper search is kept, unless the stored entry is from an older search.
+
+    Instance Attributes:
+        - size: The number of entries in the table, always a power of two
+        - keys: The Zobrist key of the position stored in each entry
+        - scores: The score of the position stored in each entry
+        - depths: The depth searched for each entry, or -1 if the entry is empty
+        - flags: Whether each score is EXACT, a LOWER_BOUND or an UPPER_BOUND
+        - generations: The search that stored each entry
+        - best_moves: The best move found in each position, encoded by encode_move, or 0 if there is none
+        - generation: The current search, increased by new_search()
+
+    Representation Invariants:
+        - self.size > 0 and self.size & (self.size - 1) == 0
+    """
+    size: int
+    keys: array
+    scores: array
+    depths: array
+    flags: array
+    generations: array
+    best_moves: array
+    generation: int
+
+    def __init__(self, memory_mb: float = DEFAULT_MEMORY_MB):
+        """
+        Create an empty table using at most memory_mb megabytes for its entries
+        """
+        entries = max(1, int(memory_mb * 1024 * 1024) // ENTRY_SIZE)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.keys = array('Q', [0]) * self.size
+        self.scores = array('d', [0]) * self.size
+        self.depths = array('b', [-1]) * self.size
+        self.flags = array('B', [0]) * self.size
+        self.generations = array('B', [0]) * self.size
+        self.best_moves = array('H', [0]) * self.size
+        self.generation = 0
+
+    def new_search(self):
+        """
+        Mark the entries stored so far as coming from an older search, so they are replaced first
+        """
+        self.generation = (self.generation + 1) % 256
+
+    def probe(self, key: int) -> Optional[tuple[int, float, int, int]]:
+        """
+        Return (depth, score, flag, best_move) stored for the position with the given key, or None if it is not stored.
+        best_move is encoded by encode_move, or 0 if there is none.
+        """
+        index = key & (self.size - 1)
+        if self.depths[index] < 0 or self.keys[index] != key:
+            return None
+        return (self.depths[index], self.scores[index], self.flags[index], self.best_moves[index])
+
+    def store(self, key: int, depth: int, score: float, flag: int, best_move: int):
+        """
+        Store the result of searching the position with the given key to depth, with its best move encoded by
+        encode_move
+        """
+        index = key & (self.size - 1)
+        if self.keys[index] == key or depth >= self.depths[index] or self.generations[index] != self.generation:
+            self.keys[index] = key
+            self.scores[index] = score
+            self.depths[index] = min(depth, 127)
+            self.flags[index] = flag
+            self.generations[index] = self.generation
+            self.best_moves[index] = best_move
+
+    def clear(self):
+        """
+        Remove every entry from the table
+        """
+        self.depths = array('b', [-1]) * self.size
+
+
+def pack_move(move: Optional[tuple[tuple[int, int], tuple[int, int]]]) -> int:
+    """
+    Pack a move into 12 bits, 6 for each square. No move is packed as 0, since a piece can't move to its own square.
+
+    >>> pack_move(((0, 4), (1, 4)))
+    772
+    >>> pack_move(None)
+    0
+    """
+    if move is None:
+        return 0
+    start, end = move
+    return (start[0] * 8 + start[1]) | (end[0] * 8 + end[1]) << 6
+
+
+def unpack_move(packed: int) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+    """
+    Return the move that was packed by pack_move
+
+    >>> unpack_move(772)
+    ((0, 4), (1, 4))
+    >>> unpack_move(0) is None
+    True
+    """
+    if packed == 0:
+        return None
+    start, end = packed & 63, packed >> 6
+    return ((start >> 3, start & 7), (end >> 3, end & 7))
@@ -0,0 +1,243 @@
+"""
+Contains Info about playing the Chess Engine through the Universal Chess Interface (UCI)
+
+Run this module to talk UCI on standard input and output, e.g. from a tournament manager:
+
+    python UCI.py
+
+It doesn't import pygame, so it starts straight away.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+from Board import Board, STARTING_FEN, coordinate_to_position, position_to_coordinate
+from Engine import Engine2, plies_to_mate
+from TranspositionTable import TranspositionTable, DEFAULT_MEMORY_MB
+
+ENGINE_NAME = 'Chess'
+ENGINE_AUTHOR = 'HussainE4'
+
+# Deepest search made when go doesn't give a depth
+MAX_DEPTH = 64
+
+# Share of the remaining time on the clock spent on each move when go gives the clocks
+MOVES_TO_GO = 30
+
+
+@dataclass
+class UCI:
+    """
+    An engine that plays through the Universal Chess Interface.
+
+    Searches run on a separate thread, so that stop can be read while the engine thinks.
+
+    Instance Attributes:
+        - output: The stream that responses are written to
+        - board: The position set by the last position command
+        - colour: The colour to move on board
+        - table: The transposition table kept between searches
+        - engine: The engine running the search in progress, or None if there is none
+        - thread: The thread running the search in progress, or None if there is none
+        - lock: Held while writing to output, as both threads write to it
+    """
+    output: TextIO
+    board: Board
+    colour: str
+    table: TranspositionTable
+    engine: Optional[Engine2]
+    thread: Optional[threading.Thread]
+    lock: threading.Lock
+
+    def __init__(self, output: TextIO = sys.stdout):
+        self.output = output
+        self.board = Board.from_fen(STARTING_FEN)
+        self.colour = 'W'
+        self.table = TranspositionTable(DEFAULT_MEMORY_MB)
+        self.engine = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def run(self, commands: TextIO = sys.stdin):
+        """
+        Answer each command read from commands until quit or the end of the input
+        """
+        for line in commands:
+            if not self.handle(line):
+                break
+        self.stop()
+
+    def send(self, message: str):
+        """
+        Write a line to the output
+        """
+        with self.lock:
+            self.output.write(message + '\n')
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        """
+        Answer the command in line. Return False if it is quit.
+        """
+        words = line.split()
+        if not words:
+            return True
+        command, arguments = words[0], words[1:]
+
+        if command == 'uci':
+            self.send(f'id name {ENGINE_NAME}')
+            self.send(f'id author {ENGINE_AUTHOR}')
+            self.send(f'option name Hash type spin default {DEFAULT_MEMORY_MB} min 1 max 4096')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'setoption':
+            self.set_option(arguments)
+        elif command == 'ucinewgame':
+            self.stop()
+            self.table.clear()
+        elif command == 'position':
+            self.stop()
+            self.set_position(arguments)
+        elif command == 'go':
+            self.stop()
+            self.go(arguments)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            return False
+        return True
+
+    def set_option(self, arguments: list[str]):
+        """
+        Set an option from the arguments of setoption, 'name <name> value <value>'
+        """
+        if 'name' in arguments and 'value' in arguments:
+            name = ' '.join(arguments[arguments.index('name') + 1:arguments.index('value')])
+            value = ' '.join(arguments[arguments.index('value') + 1:])
+            if name.lower() == 'hash':
+                self.stop()
+                self.table = TranspositionTable(int(value))
+
+    def set_position(self, arguments: list[str]):
+        """
+        Set up the position from the arguments of position, 'startpos' or 'fen <fen>', then 'moves <moves>'
+        """
+        moves = []
+        if 'moves' in arguments:
+            moves = arguments[arguments.index('moves') + 1:]
+            arguments = arguments[:arguments.index('moves')]
+
+        if arguments and arguments[0] == 'fen':
+            self.board = Board.from_fen(' '.join(arguments[1:]))
+        else:
+            self.board = Board.from_fen(STARTING_FEN)
+        self.colour = self.board.turn
+
+        for move in moves:
+            start, end = coordinate_to_position(move[0:2]), coordinate_to_position(move[2:4])
+            promotion = move[4].upper() if len(move) > 4 else None
+            self.board.make_move(start, end, promotion)
+            self.colour = 'B' if self.colour == 'W' else 'W'
+
+    def go(self, arguments: list[str]):
+        """
+        Start searching with the limits in the arguments of go: depth, movetime, nodes, or the clocks
+        """
+        limits = {}
+        for name, value in zip(arguments, arguments[1:]):
+            if value.lstrip('-').isdigit():
+                limits[name] = int(value)
+
+        max_depth = limits.get('depth', MAX_DEPTH)
+        node_limit = limits.get('nodes')
+        time_limit = None
+        if 'movetime' in limits:
+            time_limit = limits['movetime'] / 1000
+        elif ('wtime' if self.colour == 'W' else 'btime') in limits:
+            remaining = limits['wtime' if self.colour == 'W' else 'btime']
+            increment = limits.get('winc' if self.colour == 'W' else 'binc', 0)
+            time_limit = max(remaining / MOVES_TO_GO + increment / 2, 10) / 1000
+
+        self.engine = Engine2(self.board, self.table)
+        self.thread = threading.Thread(target=self.search, args=(self.engine, max_depth, time_limit, node_limit))
+        self.thread.start()
+
+    def search(self, engine: Engine2, max_depth: int, time_limit: Optional[float], node_limit: Optional[int]):
+        """
+        Search for a move with the given limits, reporting each depth searched, and send the best move found
+        """
+        start_time = time.perf_counter()
+
+        def report(depth: int, result, nodes: int, variation: list):
+            elapsed = time.perf_counter() - start_time
+            self.send(f'info depth {depth} score {self.format_score(result[1])} nodes {nodes} '
+                      f'nps {int(nodes / max(elapsed, 0.001))} time {int(elapsed * 1000)} '
+                      f'pv {self.format_variation(variation)}')
+
+        result = engine.iterative_deepening(self.colour, max_depth, time_limit, node_limit, on_iteration=report)
+        if result is not None:
+            move = result[0]
+        else:
+            # Stopped before the first depth was finished, so play any legal move
+            legal_moves = engine.ordered_legal_moves(self.colour)
+            move = legal_moves[0] if legal_moves else None
+        self.send(f'bestmove {self.format_move(move) if move is not None else "0000"}')
+
+    def stop(self):
+        """
+        Stop the search in progress, if there is one, and wait for it to send its best move
+        """
+        if self.thread is not None:
+            self.engine.stop()
+            self.thread.join()
+        self.thread = None
+        self.engine = None
+
+    def format_move(self, move: tuple[tuple[int, int], tuple[int, int]], board: Optional[Board] = None) -> str:
+        """
+        Return move in the long algebraic notation of UCI, e.g. 'e2e4', or 'e7e8q' for a promotion. The move is made
+        from the position on board, or on self.board if board is None.
+        """
+        if board is None:
+            board = self.board
+        start, end = move
+        text = position_to_coordinate(start) + position_to_coordinate(end)
+        piece = board.piece_at(start)
+        if piece is not None and piece[1] == 'P' and (end[0] == 0 or end[0] == 7):
+            # The engine always promotes to a Queen
+            text += 'q'
+        return text
+
+    def format_variation(self, variation: list) -> str:
+        """
+        Return the moves of variation in the notation of UCI, separated by spaces. The moves are played out on a copy
+        of the board, so that each one is written for the position it is made in.
+        """
+        board = Board.from_snapshot(self.board.snapshot())
+        moves = []
+        for start, end in variation:
+            text = self.format_move((start, end), board)
+            board.make_move(start, end, 'Q' if text.endswith('q') else None)
+            moves.append(text)
+        return ' '.join(moves)
+
+    def format_score(self, score: float) -> str:
+        """
+        Return score in the form UCI reports it, from the point of view of the side to move. Checkmates and wins or
+        losses in the endgame tables are reported as the number of moves until mate.
+        """
+        if self.colour == 'B':
+            score = -score
+        plies = plies_to_mate(score)
+        if plies is not None:
+            moves = (plies + 1) // 2
+            return f'mate {moves if score > 0 else -moves}'
+        return f'cp {round(score * 100)}'
+
+
+if __name__ == '__main__':
+    UCI().run()
@@ -0,0 +1,3 @@
+"""
+Tests of the Chess Engines and the modules around them
+"""
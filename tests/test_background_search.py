@@ -0,0 +1,94 @@
+"""
+Tests of running searches and pondering in the background with BackgroundSearch
+"""
+
+import threading
+import time
+import unittest
+from Board import Board, STARTING_FEN
+from BackgroundSearch import BackgroundSearch
+from TranspositionTable import TranspositionTable
+
+
+class TestBackgroundSearch(unittest.TestCase):
+    """
+    Tests of starting, polling, cancelling and pondering searches
+    """
+
+    def setUp(self):
+        self.board = Board.from_fen(STARTING_FEN)
+        self.search = BackgroundSearch(TranspositionTable(1))
+
+    def tearDown(self):
+        self.search.shutdown()
+
+    def wait_for_result(self):
+        while True:
+            result = self.search.poll()
+            if result is not None:
+                return result
+            time.sleep(0.01)
+
+    def test_search_and_poll(self):
+        self.search.start(self.board, 'W', 2)
+        self.assertTrue(self.search.is_searching())
+        move, _ = self.wait_for_result()
+        self.assertIn(move, self.board.legal_check_moves('W'))
+        self.assertFalse(self.search.is_searching())
+        self.assertIsNone(self.search.poll())
+        self.assertEqual(self.search.principal_variation[0], move)
+
+    def test_board_not_searched(self):
+        snapshot = self.board.snapshot()
+        self.search.start(self.board, 'W', 2)
+        self.wait_for_result()
+        self.assertEqual(self.board.snapshot(), snapshot)
+
+    def test_callback(self):
+        results = []
+        finished = threading.Event()
+        self.search.start(self.board, 'W', 2, callback=lambda result: (results.append(result), finished.set()))
+        self.assertTrue(finished.wait(30))
+        self.assertEqual(results, [self.wait_for_result()])
+
+    def test_cancel(self):
+        results = []
+        self.search.start(self.board, 'W', 64, callback=results.append)
+        self.search.cancel()
+        self.assertFalse(self.search.is_searching())
+        self.assertIsNone(self.search.poll())
+        # The background thread is free for the next search
+        self.search.start(self.board, 'W', 1)
+        self.wait_for_result()
+        self.assertEqual(results, [])
+
+    def test_ponder_expected_reply(self):
+        self.search.start(self.board, 'W', 3)
+        move, _ = self.wait_for_result()
+        variation = self.search.principal_variation
+        self.board.make_move(*move)
+        self.search.ponder(self.board, 'W')
+        self.assertTrue(self.search.is_pondering())
+        self.assertEqual(self.search.expected_reply, variation[1])
+
+    def test_ponder_stopped_by_search(self):
+        self.search.ponder(self.board, 'B')
+        self.assertTrue(self.search.is_pondering())
+        # Without a principal variation every reply is searched
+        self.assertIsNone(self.search.expected_reply)
+        self.search.start(self.board, 'W', 2)
+        self.assertFalse(self.search.is_pondering())
+        self.wait_for_result()
+
+    def test_cancel_stops_pondering(self):
+        self.search.ponder(self.board, 'B')
+        self.search.cancel()
+        self.assertFalse(self.search.is_pondering())
+
+    def test_stop_pondering_without_ponder(self):
+        self.search.stop_pondering()
+        self.assertFalse(self.search.is_pondering())
+
+
+if __name__ == '__main__':
+    unittest.main()
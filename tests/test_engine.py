@@ -0,0 +1,86 @@
+"""
+Tests of the search of Engine2
+"""
+
+import unittest
+from Board import Board
+from Engine import Engine2, CHECKMATE, TABLEBASE_WIN, PROVEN_SCORE, plies_to_mate, shift_proven_score
+from TranspositionTable import TranspositionTable
+
+
+class TestProvenScores(unittest.TestCase):
+    """
+    Tests of the mate distance carried in checkmate and table scores
+    """
+
+    def test_plies_to_mate(self):
+        self.assertEqual(plies_to_mate(CHECKMATE - 3), 3)
+        self.assertEqual(plies_to_mate(-(CHECKMATE - 4)), 4)
+        self.assertEqual(plies_to_mate(TABLEBASE_WIN - 0.29), 29)
+        self.assertEqual(plies_to_mate(-(TABLEBASE_WIN - 0.07)), 7)
+        self.assertIsNone(plies_to_mate(12.5))
+        self.assertIsNone(plies_to_mate(0))
+
+    def test_shift_mate(self):
+        self.assertEqual(shift_proven_score(CHECKMATE - 5, 2), CHECKMATE - 3)
+        self.assertEqual(shift_proven_score(-(CHECKMATE - 5), 2), -(CHECKMATE - 3))
+
+    def test_shift_table_win(self):
+        self.assertAlmostEqual(shift_proven_score(TABLEBASE_WIN - 0.20, 3), TABLEBASE_WIN - 0.17)
+        self.assertAlmostEqual(shift_proven_score(-(TABLEBASE_WIN - 0.20), 3), -(TABLEBASE_WIN - 0.17))
+
+    def test_shift_round_trip(self):
+        for score in (CHECKMATE - 9, -(CHECKMATE - 9), TABLEBASE_WIN - 0.4, -(TABLEBASE_WIN - 0.4)):
+            self.assertAlmostEqual(shift_proven_score(shift_proven_score(score, 4), -4), score)
+
+    def test_estimates_unchanged(self):
+        for score in (0, 3.5, -12.0, PROVEN_SCORE - 1):
+            self.assertEqual(shift_proven_score(score, 6), score)
+
+    def test_stored_counted_from_position(self):
+        # A mate found two plies below the root is stored as a mate from that position
+        board = Board.from_fen('4k3/3pp3/8/8/8/8/4P3/4K3 w - - 0 1')
+        table = TranspositionTable(0.001)
+        engine = Engine2(board, table)
+        engine.root_ply = len(board.moves)
+        board.make_move((0, 4), (0, 3))
+        board.make_move((7, 4), (7, 5))
+        engine.store(board.zobrist_key, 3, CHECKMATE - 5, -CHECKMATE, CHECKMATE, 0)
+        self.assertEqual(table.probe(board.zobrist_key)[1], CHECKMATE - 3)
+
+    def test_search_finds_mate_distance(self):
+        # The tables aren't used, so the mate in two moves has to be found by the search
+        board = Board.from_fen('2k5/8/2K5/8/8/8/8/7R b - - 0 1')
+        engine = Engine2(board, TranspositionTable(1), tablebase=None)
+        _, score = engine.iterative_deepening('B', 6)
+        self.assertEqual(score, CHECKMATE - 4)
+
+
+class TestTablebaseScores(unittest.TestCase):
+    """
+    Tests of how wins in the endgame tables are ranked against checkmates and material
+    """
+
+    def test_short_mate_beats_trading_into_tables(self):
+        # Forcing the King to take the Queen reaches a won ending in the KRK table, but White can mate in two moves
+        board = Board.from_fen('1R6/2k5/Q7/5K2/8/8/8/8 w - - 0 1')
+        engine = Engine2(board, TranspositionTable(1))
+        move, score = engine.iterative_deepening('W', 6)
+        self.assertGreater(score, TABLEBASE_WIN)
+        self.assertEqual(plies_to_mate(score), 3)
+        self.assertIsNotNone(move)
+
+    def test_table_wins_ranked_between_mates_and_material(self):
+        engine = Engine2(Board.from_fen('8/8/8/4k3/8/8/8/KR6 w - - 0 1'), TranspositionTable(1))
+        slow_win = engine.tablebase_score(30, 'W')
+        fast_win = engine.tablebase_score(10, 'W')
+        self.assertLess(slow_win, fast_win)
+        self.assertLess(fast_win, CHECKMATE - 50)
+
+        # Even a whole army against a lone King evaluates below a win in the tables
+        material = Engine2(Board.from_fen('4k3/8/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1'), TranspositionTable(1))
+        self.assertLess(material.evaluate_v1(0, 'W', None), slow_win)
+
+
+if __name__ == '__main__':
+    unittest.main()
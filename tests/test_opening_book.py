@@ -0,0 +1,96 @@
+"""
+Tests of building and reading the OpeningBook
+"""
+
+import os
+import tempfile
+import unittest
+from Board import Board, EMPTY_BOARD
+from OpeningBook import OpeningBook, ENTRY_FORMAT, ENTRY_SIZE, build_book, parse_san, read_pgn_games
+
+GAMES = """[Event "First"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bb5 1-0
+
+[Event "Second"]
+
+1. e4 {The most popular move} c5 2. Nf3 (2. c3) d6 0-1
+
+[Event "Third"]
+
+1. d4 d5 1/2-1/2
+"""
+
+
+class TestOpeningBook(unittest.TestCase):
+    """
+    Tests of looking positions up in a book built from a few games
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        pgn_path = os.path.join(self.directory.name, 'games.pgn')
+        with open(pgn_path, 'w') as file:
+            file.write(GAMES)
+        self.book_path = os.path.join(self.directory.name, 'book.bin')
+        self.written = build_book([pgn_path], self.book_path, plies=4)
+        self.book = OpeningBook(self.book_path)
+
+    def tearDown(self):
+        self.book.close()
+        self.directory.cleanup()
+
+    def test_entries_weighted_by_games(self):
+        board = Board(EMPTY_BOARD)
+        entries = dict(self.book.entries(board.zobrist_key))
+        self.assertEqual(entries, {((1, 4), (3, 4)): 2, ((1, 3), (3, 3)): 1})
+
+    def test_entries_written(self):
+        # Every move of the first 4 plies, with 1. e4 shared by two games
+        self.assertEqual(self.written, 9)
+        self.assertEqual(self.book.size, 9)
+        keys = [ENTRY_FORMAT.unpack_from(self.book.data, index * ENTRY_SIZE)[0] for index in range(self.book.size)]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_choose_move_in_book(self):
+        board = Board(EMPTY_BOARD)
+        board.make_move((1, 4), (3, 4))
+        self.assertIn(self.book.choose_move(board), [((6, 4), (4, 4)), ((6, 2), (4, 2))])
+
+    def test_choose_move_out_of_book(self):
+        board = Board(EMPTY_BOARD)
+        board.make_move((1, 0), (2, 0))
+        self.assertIsNone(self.book.choose_move(board))
+
+    def test_plies_limit(self):
+        board = Board(EMPTY_BOARD)
+        for san in ('e4', 'e5', 'Nf3', 'Nc6'):
+            start, end, promotion = parse_san(board, san)
+            board.make_move(start, end, promotion)
+        self.assertIsNone(self.book.choose_move(board))
+
+    def test_empty_book(self):
+        path = os.path.join(self.directory.name, 'empty.bin')
+        open(path, 'wb').close()
+        book = OpeningBook(path)
+        self.assertEqual(book.size, 0)
+        self.assertIsNone(book.choose_move(Board(EMPTY_BOARD)))
+
+
+class TestPgn(unittest.TestCase):
+    """
+    Tests of reading games in PGN format
+    """
+
+    def test_read_games(self):
+        self.assertEqual(list(read_pgn_games(GAMES)), [['e4', 'e5', 'Nf3', 'Nc6', 'Bb5'], ['e4', 'c5', 'Nf3', 'd6'],
+                                                       ['d4', 'd5']])
+
+    def test_parse_promotion(self):
+        board = Board.from_fen('8/1P5k/8/8/8/8/6K1/8 w - - 0 1')
+        self.assertEqual(parse_san(board, 'b8=N'), ((6, 1), (7, 1), 'N'))
+        self.assertEqual(parse_san(board, 'b8'), ((6, 1), (7, 1), 'Q'))
+
+
+if __name__ == '__main__':
+    unittest.main()
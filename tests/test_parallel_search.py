@@ -0,0 +1,39 @@
+"""
+Tests of splitting the root moves between processes with ParallelSearch
+"""
+
+import unittest
+from Board import Board, STARTING_FEN
+from Engine import CHECKMATE
+from ParallelSearch import ParallelSearch
+
+
+class TestParallelSearch(unittest.TestCase):
+    """
+    Tests of the moves and scores found by a ParallelSearch
+    """
+
+    def setUp(self):
+        self.search = ParallelSearch(2, table_mb=1)
+
+    def tearDown(self):
+        self.search.shutdown()
+
+    def test_legal_move(self):
+        board = Board.from_fen(STARTING_FEN)
+        move, _ = self.search.select_move(board, 'W', 2)
+        self.assertIn(move, board.legal_check_moves('W'))
+        self.assertEqual(self.search.depth_reached, 2)
+        self.assertGreater(self.search.nodes, 0)
+
+    def test_checkmated(self):
+        self.assertEqual(self.search.select_move(Board.from_fen('R6k/8/6K1/8/8/8/8/8 b - - 0 1'), 'B', 3),
+                         (None, CHECKMATE))
+        self.assertIsNone(self.search.executor)
+
+    def test_stalemate(self):
+        self.assertEqual(self.search.select_move(Board.from_fen('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'), 'B', 3), (None, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Tests of move generation on Board and BitBoard, by counting the positions of the standard perft suite
+"""
+
+import unittest
+from Board import Board
+from BitBoard import BitBoard
+from Perft import PERFT_SUITE, perft
+
+# Deepest depth of each position counted, to keep the tests quick. python Perft.py counts all of them.
+TEST_DEPTH = 2
+
+
+class TestPerft(unittest.TestCase):
+    """
+    Tests of the counts of PERFT_SUITE to TEST_DEPTH
+    """
+
+    def check_suite(self, use_bitboards: bool, use_cache: bool):
+        for name, fen, counts in PERFT_SUITE:
+            for depth, expected in enumerate(counts[:TEST_DEPTH], 1):
+                with self.subTest(name=name, depth=depth):
+                    board = Board.from_fen(fen)
+                    colour = board.turn
+                    if use_bitboards:
+                        board = BitBoard(board)
+                    self.assertEqual(perft(board, colour, depth, {} if use_cache else None), expected)
+
+    def test_board(self):
+        self.check_suite(False, False)
+
+    def test_bitboard(self):
+        self.check_suite(True, False)
+
+    def test_cache(self):
+        self.check_suite(False, True)
+
+    def test_moves_undone(self):
+        for _, fen, _ in PERFT_SUITE:
+            board = Board.from_fen(fen)
+            snapshot, key = board.snapshot(), board.zobrist_key
+            perft(board, board.turn, TEST_DEPTH)
+            self.assertEqual(board.snapshot(), snapshot)
+            self.assertEqual(board.zobrist_key, key)
+            self.assertEqual(board.to_fen(), fen)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Tests of the endgame tables
+"""
+
+import tempfile
+import unittest
+from Board import Board
+from BitBoard import BitBoard
+from Engine import Engine2, TABLEBASE_WIN
+from Tablebase import TABLEBASE, Tablebase, decode_value, encode_value
+
+
+class TestValues(unittest.TestCase):
+    """
+    Tests of the encoding of table entries
+    """
+
+    def test_round_trip(self):
+        for result, plies in ((1, 1), (1, 37), (-1, 0), (-1, 28)):
+            self.assertEqual(decode_value(encode_value(result, plies)), (result, plies))
+
+
+class TestProbes(unittest.TestCase):
+    """
+    Tests of looking positions up in the tables
+    """
+
+    def probe(self, fen: str):
+        board = Board.from_fen(fen)
+        value = TABLEBASE.probe_board(board, board.turn)
+        return None if value is None else decode_value(value)
+
+    def test_mate_in_one(self):
+        self.assertEqual(self.probe('3k4/8/3K4/8/8/8/8/6R1 w - - 0 1'), (1, 1))
+
+    def test_checkmated(self):
+        self.assertEqual(self.probe('R6k/8/6K1/8/8/8/8/8 b - - 0 1'), (-1, 0))
+
+    def test_losing_side_to_move(self):
+        self.assertEqual(self.probe('k7/8/1K6/8/8/8/8/7r w - - 0 1'), (-1, 28))
+
+    def test_colours_swapped(self):
+        # The same position with the colours swapped and the board flipped
+        self.assertEqual(self.probe('6r1/8/8/8/8/3k4/8/3K4 b - - 0 1'), self.probe('3k4/8/3K4/8/8/8/8/6R1 w - - 0 1'))
+
+    def test_drawn_endings(self):
+        self.assertEqual(self.probe('8/8/8/4k3/8/8/8/K7 w - - 0 1'), (0, 0))
+        self.assertEqual(self.probe('8/8/8/4k3/8/8/8/KN6 w - - 0 1'), (0, 0))
+
+    def test_too_many_pieces(self):
+        self.assertIsNone(self.probe('8/8/8/4k3/8/8/8/KRR5 w - - 0 1'))
+
+    def test_missing_table(self):
+        self.assertIsNone(self.probe('k7/8/8/8/8/8/8/K2N3N w - - 0 1'))
+        with tempfile.TemporaryDirectory() as directory:
+            board = Board.from_fen('3k4/8/3K4/8/8/8/8/6R1 w - - 0 1')
+            self.assertIsNone(Tablebase(directory).probe_board(board, 'W'))
+
+    def test_castling_rights_not_probed(self):
+        self.assertIsNone(self.probe('4k3/8/8/8/8/8/8/R3K3 w Q - 0 1'))
+
+    def test_bitboard_probe(self):
+        board = Board.from_fen('k7/8/1K6/8/8/8/8/7r w - - 0 1')
+        self.assertEqual(TABLEBASE.probe_board(BitBoard(board), 'W'), TABLEBASE.probe_board(board, 'W'))
+
+
+class TestTablebaseMoves(unittest.TestCase):
+    """
+    Tests of the engine playing from the tables
+    """
+
+    def test_plays_mate_in_one(self):
+        engine = Engine2(Board.from_fen('3k4/8/3K4/8/8/8/8/6R1 w - - 0 1'))
+        self.assertEqual(engine.tablebase_move('W'), (((0, 6), (7, 6)), TABLEBASE_WIN - 0.01))
+
+    def test_reports_iteration(self):
+        iterations = []
+        engine = Engine2(Board.from_fen('3k4/8/3K4/8/8/8/8/6R1 w - - 0 1'))
+        result = engine.iterative_deepening('W', 4, on_iteration=lambda *arguments: iterations.append(arguments))
+        self.assertEqual(iterations, [(1, result, 0, [result[0]])])
+
+
+if __name__ == '__main__':
+    unittest.main()
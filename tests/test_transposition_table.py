@@ -0,0 +1,102 @@
+"""
+Tests of the TranspositionTable and the bounds the search stores in it
+"""
+
+import unittest
+from Board import Board
+from Engine import Engine2
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, pack_move, unpack_move
+
+
+class TestTranspositionTable(unittest.TestCase):
+    """
+    Tests of storing, probing and replacing entries
+    """
+
+    def setUp(self):
+        self.table = TranspositionTable(0.001)
+
+    def test_size_is_power_of_two(self):
+        self.assertGreater(self.table.size, 0)
+        self.assertEqual(self.table.size & (self.table.size - 1), 0)
+
+    def test_probe_empty(self):
+        self.assertIsNone(self.table.probe(12345))
+
+    def test_store_and_probe(self):
+        self.table.store(12345, 3, 1.5, LOWER_BOUND, 772)
+        self.assertEqual(self.table.probe(12345), (3, 1.5, LOWER_BOUND, 772))
+
+    def test_other_key_in_same_slot_not_returned(self):
+        self.table.store(7, 3, 1.5, EXACT, 0)
+        self.assertIsNone(self.table.probe(7 + self.table.size))
+
+    def test_shallower_search_does_not_replace_deeper(self):
+        self.table.store(7, 5, 1.0, EXACT, 0)
+        self.table.store(7 + self.table.size, 2, 2.0, EXACT, 0)
+        self.assertEqual(self.table.probe(7), (5, 1.0, EXACT, 0))
+        self.assertIsNone(self.table.probe(7 + self.table.size))
+
+    def test_same_position_always_replaced(self):
+        self.table.store(7, 5, 1.0, EXACT, 0)
+        self.table.store(7, 2, 2.0, UPPER_BOUND, 0)
+        self.assertEqual(self.table.probe(7), (2, 2.0, UPPER_BOUND, 0))
+
+    def test_older_generation_replaced_first(self):
+        self.table.store(7, 5, 1.0, EXACT, 0)
+        self.table.new_search()
+        self.table.store(7 + self.table.size, 2, 2.0, EXACT, 0)
+        self.assertIsNone(self.table.probe(7))
+        self.assertEqual(self.table.probe(7 + self.table.size), (2, 2.0, EXACT, 0))
+
+    def test_generation_wraps(self):
+        for _ in range(256):
+            self.table.new_search()
+        self.assertEqual(self.table.generation, 0)
+
+    def test_depth_capped(self):
+        self.table.store(7, 500, 1.0, EXACT, 0)
+        self.assertEqual(self.table.probe(7)[0], 127)
+
+    def test_clear(self):
+        self.table.store(7, 5, 1.0, EXACT, 0)
+        self.table.clear()
+        self.assertIsNone(self.table.probe(7))
+
+    def test_pack_move_round_trip(self):
+        move = ((1, 4), (3, 4))
+        self.assertEqual(unpack_move(pack_move(move)), move)
+
+
+class TestSearchBounds(unittest.TestCase):
+    """
+    Tests of the bounds stored by Engine2 for scores outside of its window
+    """
+
+    def setUp(self):
+        self.table = TranspositionTable(0.001)
+        self.engine = Engine2(Board.from_fen('4k3/3pp3/8/8/8/8/4P3/4K3 w - - 0 1'), self.table)
+        self.key = self.engine.board.zobrist_key
+
+    def test_fail_low_is_upper_bound(self):
+        self.engine.store(self.key, 2, -1.0, -1.0, 1.0, 0)
+        self.assertEqual(self.table.probe(self.key)[2], UPPER_BOUND)
+
+    def test_fail_high_is_lower_bound(self):
+        self.engine.store(self.key, 2, 1.0, -1.0, 1.0, 0)
+        self.assertEqual(self.table.probe(self.key)[2], LOWER_BOUND)
+
+    def test_inside_window_is_exact(self):
+        self.engine.store(self.key, 2, 0.5, -1.0, 1.0, 0)
+        self.assertEqual(self.table.probe(self.key)[:3], (2, 0.5, EXACT))
+
+    def test_search_stores_root(self):
+        self.engine.iterative_deepening('W', 2)
+        entry = self.table.probe(self.key)
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry[0], 2)
+        self.assertNotEqual(entry[3], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
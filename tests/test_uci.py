@@ -0,0 +1,129 @@
+"""
+Tests of the commands answered by UCI
+"""
+
+import io
+import unittest
+from Board import coordinate_to_position
+from Engine import CHECKMATE, TABLEBASE_WIN
+from UCI import UCI
+
+
+class TestUCI(unittest.TestCase):
+    """
+    Tests of the responses to commands and the notation of moves and scores
+    """
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.uci = UCI(self.output)
+        self.uci.handle('setoption name Hash value 1')
+
+    def tearDown(self):
+        self.uci.stop()
+
+    def lines(self) -> list[str]:
+        return self.output.getvalue().splitlines()
+
+    def search(self, *commands: str) -> list[str]:
+        """
+        Send the commands, wait for the search started by the last one to finish and return the output
+        """
+        for command in commands:
+            self.uci.handle(command)
+        self.uci.thread.join()
+        return self.lines()
+
+    def test_uci(self):
+        self.uci.handle('uci')
+        self.assertEqual(self.lines()[0], 'id name Chess')
+        self.assertEqual(self.lines()[-1], 'uciok')
+
+    def test_isready(self):
+        self.uci.handle('isready')
+        self.assertEqual(self.lines(), ['readyok'])
+
+    def test_quit(self):
+        self.assertFalse(self.uci.handle('quit'))
+        self.assertTrue(self.uci.handle(''))
+
+    def test_hash_option(self):
+        size = self.uci.table.size
+        self.uci.handle('setoption name Hash value 2')
+        self.assertEqual(self.uci.table.size, size * 2)
+
+    def test_position_moves(self):
+        self.uci.handle('position startpos moves e2e4 e7e5 g1f3')
+        self.assertEqual(self.uci.colour, 'B')
+        self.assertEqual(self.uci.board.piece_at((2, 5)), 'WN')
+
+    def test_position_fen_promotion(self):
+        self.uci.handle('position fen 8/1P5k/8/8/8/8/6K1/8 w - - 0 1 moves b7b8n')
+        self.assertEqual(self.uci.board.piece_at((7, 1)), 'WN')
+        self.assertEqual(self.uci.colour, 'B')
+
+    def test_go_depth(self):
+        lines = self.search('position startpos', 'go depth 2')
+        self.assertTrue(lines[0].startswith('info depth 1 score cp '))
+        self.assertTrue(lines[1].startswith('info depth 2 '))
+        self.assertRegex(lines[-1], r'^bestmove [a-h][1-8][a-h][1-8]$')
+
+    def test_go_mate(self):
+        lines = self.search('position fen 6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1', 'go depth 3')
+        self.assertIn('score mate 1 ', lines[-2])
+        self.assertEqual(lines[-1], 'bestmove a1a8')
+
+    def test_go_tablebase(self):
+        lines = self.search('position fen 3k4/8/3K4/8/8/8/8/6R1 w - - 0 1', 'go depth 5')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('info depth 1 score mate 1 '))
+        self.assertEqual(lines[1], 'bestmove g1g8')
+
+    def test_go_checkmated(self):
+        lines = self.search('position fen R6k/8/6K1/8/8/8/8/8 b - - 0 1', 'go depth 2')
+        self.assertEqual(lines[-1], 'bestmove 0000')
+
+    def test_stop(self):
+        self.uci.handle('position startpos')
+        self.uci.handle('go infinite')
+        self.uci.handle('stop')
+        self.assertIsNone(self.uci.thread)
+        self.assertTrue(self.lines()[-1].startswith('bestmove '))
+
+    def test_promotion_in_pv(self):
+        self.uci.handle('position fen 8/P6k/8/8/8/8/6Kp/8 w - - 0 1')
+        variation = [(coordinate_to_position('a7'), coordinate_to_position('a8')),
+                     (coordinate_to_position('h2'), coordinate_to_position('h1')),
+                     (coordinate_to_position('g2'), coordinate_to_position('h1'))]
+        self.assertEqual(self.uci.format_variation(variation), 'a7a8q h2h1q g2h1')
+
+    def test_promotion_late_in_pv(self):
+        # The pawn only reaches the seventh rank during the line, so the square it promotes from is empty at the root
+        self.uci.handle('position fen 8/7k/1P6/8/8/8/6K1/8 w - - 0 1')
+        variation = [(coordinate_to_position('b6'), coordinate_to_position('b7')),
+                     (coordinate_to_position('h7'), coordinate_to_position('g6')),
+                     (coordinate_to_position('b7'), coordinate_to_position('b8'))]
+        self.assertEqual(self.uci.format_variation(variation), 'b6b7 h7g6 b7b8q')
+
+    def test_no_promotion_from_captured_pawn(self):
+        # The King moves from the square of the pawn it took, which isn't a promotion
+        self.uci.handle('position fen k7/8/8/8/8/6K1/7p/8 w - - 0 1')
+        variation = [(coordinate_to_position('g3'), coordinate_to_position('h2')),
+                     (coordinate_to_position('a8'), coordinate_to_position('b8')),
+                     (coordinate_to_position('h2'), coordinate_to_position('h1'))]
+        self.assertEqual(self.uci.format_variation(variation), 'g3h2 a8b8 h2h1')
+
+    def test_format_score(self):
+        self.assertEqual(self.uci.format_score(1.234), 'cp 123')
+        self.assertEqual(self.uci.format_score(CHECKMATE - 3), 'mate 2')
+        self.assertEqual(self.uci.format_score(-(CHECKMATE - 2)), 'mate -1')
+        self.assertEqual(self.uci.format_score(TABLEBASE_WIN - 0.29), 'mate 15')
+
+    def test_format_score_black(self):
+        self.uci.handle('position startpos moves e2e4')
+        self.assertEqual(self.uci.format_score(1.5), 'cp -150')
+        self.assertEqual(self.uci.format_score(CHECKMATE - 1), 'mate -1')
+
+
+if __name__ == '__main__':
+    unittest.main()